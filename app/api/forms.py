@@ -0,0 +1,159 @@
+"""
+Streaming multipart parsing for the upload endpoints.
+
+Starlette's form parser spools every file part to its own temporary file
+before the handler runs, so size limits could only be checked after the
+whole body was on disk and each upload was then copied a second time.
+`receive_form` instead feeds the request stream straight into
+python-multipart and writes each file part to its final location in the
+job's input directory (or memory, for small parts) as the bytes arrive:
+an oversize upload is rejected after at most `max_bytes` of it, and nothing
+is written twice. Requests whose Content-Length already exceeds the limit
+are rejected before any of the body is read, and the bytes actually received
+are counted against the same limit, so chunked requests without a
+Content-Length are bounded too. Text fields are capped in size and number.
+"""
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError  # type: ignore
+    from multipart.multipart import MultipartParser, parse_options_header  # type: ignore
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.audio.io import AudioSource
+from app.utils.uploads import INMEMORY_MAX_BYTES, MAX_UPLOAD_BYTES, UploadSink, UploadTooLargeError
+
+# Allowance for multipart boundaries, part headers and the small form fields
+FORM_OVERHEAD_BYTES = 64 * 1024
+MAX_FIELD_BYTES = 4096
+# Same default as Starlette's form parser
+MAX_FIELDS = 1000
+
+
+class FormError(ValueError):
+    """Raised for malformed multipart bodies or missing/unknown parts."""
+
+
+class _FormReceiver:
+    def __init__(self, dest_dir: Path, file_fields: Sequence[str], max_bytes: int, inmemory_max: int):
+        self.dest_dir = dest_dir
+        self.file_fields = set(file_fields)
+        self.max_bytes = max_bytes
+        self.inmemory_max = inmemory_max
+        self.fields: Dict[str, str] = {}
+        self.files: Dict[str, AudioSource] = {}
+        self.sinks: Dict[str, UploadSink] = {}
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._name = ""
+        self._sink: Optional[UploadSink] = None
+        self._data = bytearray()
+        self._n_fields = 0
+
+    def on_part_begin(self) -> None:
+        self._headers, self._name, self._sink, self._data = {}, "", None, bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise FormError("Multipart part without a name")
+        self._name = options[b"name"].decode("utf-8", "replace")
+        if b"filename" not in options:
+            self._n_fields += 1
+            if self._n_fields > MAX_FIELDS:
+                raise FormError(f"Too many form fields (maximum {MAX_FIELDS})")
+            return
+        if self._name not in self.file_fields or self._name in self.sinks:
+            raise FormError(f"Unexpected file field: {self._name}")
+        suffix = Path(options[b"filename"].decode("utf-8", "replace")).suffix.lower() or ".wav"
+        self._sink = self.sinks[self._name] = UploadSink(
+            self.dest_dir / f"{self._name}{suffix}", self.max_bytes, self.inmemory_max
+        )
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._sink is not None:
+            self._sink.write(data[start:end])
+            return
+        self._data += data[start:end]
+        if len(self._data) > MAX_FIELD_BYTES:
+            raise FormError(f"Form field {self._name} is too long")
+
+    def on_part_end(self) -> None:
+        if self._sink is not None:
+            self.files[self._name] = self._sink.finish()
+        else:
+            self.fields[self._name] = self._data.decode("utf-8", "replace")
+
+    def discard(self) -> None:
+        for sink in self.sinks.values():
+            sink.discard()
+
+
+async def receive_form(
+    request: Request,
+    dest_dir: Path,
+    file_fields: Sequence[str],
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    inmemory_max: int = INMEMORY_MAX_BYTES,
+) -> Tuple[Dict[str, str], Dict[str, AudioSource]]:
+    """Parse a multipart body, writing the `file_fields` parts into `dest_dir`.
+
+    Returns (text fields, uploads). Raises UploadTooLargeError as soon as a
+    file part passes `max_bytes`, and FormError for malformed bodies or
+    missing file parts.
+    """
+    max_body = max_bytes * len(file_fields) + FORM_OVERHEAD_BYTES
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_body:
+        raise UploadTooLargeError(f"Request body of {length} bytes exceeds the upload limit")
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    if b"boundary" not in params:
+        raise FormError("Expected a multipart/form-data body")
+
+    receiver = _FormReceiver(dest_dir, file_fields, max_bytes, inmemory_max)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": receiver.on_part_begin,
+        "on_part_data": receiver.on_part_data,
+        "on_part_end": receiver.on_part_end,
+        "on_header_field": receiver.on_header_field,
+        "on_header_value": receiver.on_header_value,
+        "on_header_end": receiver.on_header_end,
+        "on_headers_finished": receiver.on_headers_finished,
+    })
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise UploadTooLargeError(f"Request body exceeds {max_body} bytes")
+            # Callbacks write file data to disk, so keep them off the event loop
+            await run_in_threadpool(parser.write, chunk)
+        parser.finalize()
+    except FormParserError as e:
+        receiver.discard()
+        raise FormError("Invalid multipart data") from e
+    except BaseException:
+        receiver.discard()
+        raise
+    missing = [f for f in file_fields if f not in receiver.files]
+    if missing:
+        receiver.discard()
+        raise FormError(f"Missing file field(s): {', '.join(missing)}")
+    return receiver.fields, receiver.files
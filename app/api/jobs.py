@@ -0,0 +1,218 @@
+"""
+Background job queue for the API.
+
+Jobs run `run_pipeline` on a bounded thread pool so request handlers never
+block the event loop. Every job gets its own directory under the jobs root
+(inputs + outputs), so concurrent jobs never share temp files. A
+client-chosen output name is a subdirectory of that job directory, and a
+job's directory is deleted when the job is pruned from the history.
+"""
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.audio.io import AudioSource
+from app.pipeline.config import PipelineConfig
+from app.utils.logging import get_logger
+
+
+log = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the number of waiting jobs reached the configured limit."""
+
+
+class InvalidOutputDir(ValueError):
+    """Raised when a requested output directory would leave the job directory."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running pipeline when its job has been cancelled."""
+
+
+@dataclass
+class Job:
+    id: str
+    dir: Path
+    out_dir: Path
+    status: str = QUEUED
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: Optional[Future] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def input_dir(self) -> Path:
+        return self.dir / "inputs"
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(
+        self,
+        root: Path,
+        max_workers: int = 1,
+        max_queued: int = 8,
+        max_history: int = 1000,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.root = root
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_history = max_history
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status == QUEUED)
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.status == RUNNING)
+
+    def create(self, out_dir: Optional[str] = None) -> Job:
+        """Reserve a job slot and its isolated directory. `out_dir`, if given,
+        names a subdirectory of the job directory for the outputs.
+
+        Raises QueueFullError when `max_queued` jobs are already waiting and
+        InvalidOutputDir when `out_dir` is absolute or escapes the job directory.
+        """
+        name = _output_subdir(out_dir)
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == QUEUED)
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({queued} waiting)")
+            job_id = uuid.uuid4().hex
+            job_dir = self.root / job_id
+            job = Job(id=job_id, dir=job_dir, out_dir=job_dir / name if name else job_dir)
+            self._jobs[job_id] = job
+            expired = self._prune_locked()
+        for d in expired:
+            shutil.rmtree(d, ignore_errors=True)
+        job.input_dir.mkdir(parents=True, exist_ok=True)
+        return job
+
+    def set_out_dir(self, job: Job, out_dir: Optional[str]) -> None:
+        """Point a not yet submitted job's outputs at a subdirectory of its
+        directory (e.g. once the form field naming it has been received)."""
+        name = _output_subdir(out_dir)
+        job.out_dir = job.dir / name if name else job.dir
+
+    def submit(self, job: Job, mixture_path: AudioSource, target_path: AudioSource, cfg: PipelineConfig) -> Future:
+        job.future = self._pool.submit(self._run, job, mixture_path, target_path, cfg)
+        return job.future
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job. Queued jobs never start; running jobs stop at the next stage."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+    def discard(self, job: Job) -> None:
+        """Drop a job that was created but never submitted (e.g. bad upload)."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        shutil.rmtree(job.dir, ignore_errors=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.status not in FINISHED_STATES:
+                self.cancel(job.id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, mixture_path: AudioSource, target_path: AudioSource, cfg: PipelineConfig) -> Path:
+        from app.main import run_pipeline
+
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            raise JobCancelled(job.id)
+
+        def _progress(stage: str) -> None:
+            job.stage = stage
+            if job.cancel_event.is_set():
+                raise JobCancelled(job.id)
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            run_pipeline(mixture_path, target_path, job.out_dir, cfg, progress=_progress)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+            raise
+        except Exception as e:
+            log.error(f"Job {job.id} failed: {e}")
+            self._finish(job, FAILED, error=str(e))
+            raise
+        self._finish(job, SUCCEEDED)
+        return job.out_dir
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        shutil.rmtree(job.input_dir, ignore_errors=True)
+
+    def _prune_locked(self) -> List[Path]:
+        """Forget finished jobs beyond `max_history` or older than `ttl_seconds`;
+        returns their directories for the caller to delete outside the lock."""
+        finished = sorted(
+            (j for j in self._jobs.values() if j.status in FINISHED_STATES),
+            key=lambda j: j.finished_at or 0.0,
+        )
+        excess = max(0, len(self._jobs) - self.max_history)
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else None
+        pruned = [
+            j for i, j in enumerate(finished)
+            if i < excess or (cutoff is not None and (j.finished_at or 0.0) < cutoff)
+        ]
+        for j in pruned:
+            del self._jobs[j.id]
+        return [j.dir for j in pruned]
+
+
+def _output_subdir(out_dir: Optional[str]) -> Optional[Path]:
+    if not out_dir:
+        return None
+    rel = Path(out_dir)
+    if rel.is_absolute() or rel.drive or any(part == ".." for part in rel.parts):
+        raise InvalidOutputDir(f"out_dir must be a relative path inside the job directory: {out_dir}")
+    return rel
@@ -1,13 +1,64 @@
+import asyncio
+import os
+import re
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
+from app.api.forms import FormError, receive_form
+from app.api.jobs import InvalidOutputDir, JobManager, QueueFullError, SUCCEEDED, FINISHED_STATES
+from app.pipeline.asr import WHISPER_MODEL_SIZES
 from app.pipeline.config import PipelineConfig
-from app.main import run_pipeline
+from app.pipeline.warmup import failed_models, is_ready, parse_models, warm_up, warmup_status
+from app.utils.memory import current_rss
+from app.utils.metrics import JOB_QUEUE_DEPTH, JOBS_RUNNING, PROCESS_RSS, REGISTRY
+from app.utils.threads import apply_thread_budget, plan_threads
+from app.utils.uploads import UploadTooLargeError
 
-app = FastAPI(title="Target Speaker Diarization + ASR (baseline)")
+# Concurrent jobs share one model instance per stage through micro-batching
+INFERENCE_BATCHING = os.environ.get("VP_INFERENCE_BATCHING", "1") != "0"
+# Cores are split between concurrent jobs / batcher workers (see app.utils.threads)
+THREAD_BUDGET = plan_threads(PipelineConfig(
+    cpu_threads=int(os.environ.get("VP_CPU_THREADS", "0")),
+    concurrent_jobs=int(os.environ.get("VP_MAX_CONCURRENT_JOBS", "1")),
+    inference_batching=INFERENCE_BATCHING,
+))
+
+jobs = JobManager(
+    root=Path(os.environ.get("VP_JOBS_DIR", "outputs/jobs")),
+    max_workers=THREAD_BUDGET.concurrent_jobs,
+    max_queued=int(os.environ.get("VP_MAX_QUEUED_JOBS", "8")),
+    ttl_seconds=float(os.environ.get("VP_JOB_TTL_SECONDS", "86400")) or None,
+)
+JOB_QUEUE_DEPTH.set_function(jobs.queue_depth)
+JOBS_RUNNING.set_function(jobs.running_count)
+PROCESS_RSS.set_function(lambda: current_rss() or 0)
+# Unset: the config's default models; "" or "none": no warm-up (ready immediately)
+WARMUP_MODELS = (
+    PipelineConfig().warmup_models if "VP_WARMUP_MODELS" not in os.environ
+    else parse_models(os.environ["VP_WARMUP_MODELS"])
+)
+# Warm up on the device requests run on by default, so the first job hits the cache
+WARMUP_DEVICE = os.environ.get("VP_WARMUP_DEVICE", PipelineConfig().device)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    apply_thread_budget(THREAD_BUDGET)
+    # Warm up in the background so /ready can answer while models load
+    threading.Thread(
+        target=warm_up, args=(WARMUP_MODELS, WARMUP_DEVICE), name="model-warmup", daemon=True
+    ).start()
+    yield
+    jobs.shutdown()
+
+
+app = FastAPI(title="Target Speaker Diarization + ASR (baseline)", lifespan=lifespan)
 
 
 class RunResponse(BaseModel):
@@ -15,34 +66,158 @@ class RunResponse(BaseModel):
     diarization_json: str
 
 
-@app.post("/run", response_model=RunResponse)
-async def run(
-    mixture: UploadFile = File(...),
-    target: UploadFile = File(...),
-    out_dir: Optional[str] = Form(None),
-    asr_backend: str = Form("whisper"),
-    asr_model: str = Form("tiny"),
-    device: str = Form("cpu"),
-    threshold: float = Form(0.6),
-):
-    """Run offline pipeline on uploaded files."""
-    out = Path(out_dir or "outputs")
-    tmp = out / "_tmp"
-    tmp.mkdir(parents=True, exist_ok=True)
-
-    mix_path = tmp / "mixture.wav"
-    tgt_path = tmp / "target.wav"
-    mix_path.write_bytes(await mixture.read())
-    tgt_path.write_bytes(await target.read())
-
-    cfg = PipelineConfig(
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+def _result(out: Path) -> RunResponse:
+    return RunResponse(
+        target_audio=str(out / "target_speaker.wav"),
+        diarization_json=str(out / "diarization.json"),
+    )
+
+
+_DEVICE_RE = re.compile(r"cpu|cuda(:\d{1,2})?")
+
+# Multipart fields accepted by /run and /jobs (documented in the OpenAPI schema)
+UPLOAD_FIELDS = ("mixture", "target")
+_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": list(UPLOAD_FIELDS),
+            "properties": {
+                "mixture": {"type": "string", "format": "binary"},
+                "target": {"type": "string", "format": "binary"},
+                "out_dir": {"type": "string"},
+                "asr_backend": {"type": "string", "default": "whisper"},
+                "asr_model": {"type": "string", "default": "tiny"},
+                "device": {"type": "string", "default": "cpu"},
+                "threshold": {"type": "number", "default": 0.6},
+                "cluster_speakers": {"type": "boolean", "default": False},
+            },
+        }}},
+    }
+}
+
+
+def _form_config(fields: Dict[str, str]) -> PipelineConfig:
+    """Build the run config from form fields. Model and device names are
+    checked against known values: each distinct one gets its own model
+    instance and batcher, so they must not be client-controlled strings."""
+    try:
+        threshold = float(fields.get("threshold", "0.6"))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="threshold must be a number")
+    asr_backend = fields.get("asr_backend", "whisper")
+    asr_model = fields.get("asr_model", "tiny")
+    device = fields.get("device", "cpu")
+    if asr_backend != "whisper":
+        raise HTTPException(status_code=422, detail=f"Unknown asr_backend: {asr_backend!r}")
+    if asr_model not in WHISPER_MODEL_SIZES:
+        raise HTTPException(status_code=422, detail=f"Unknown asr_model: {asr_model!r}")
+    if not _DEVICE_RE.fullmatch(device):
+        raise HTTPException(status_code=422, detail=f"device must be cpu, cuda or cuda:N, not {device!r}")
+    return PipelineConfig(
         asr_backend=asr_backend,
         asr_model=asr_model,
         device=device,
         target_threshold=threshold,
+        cluster_other_speakers=fields.get("cluster_speakers", "false").strip().lower() in ("1", "true", "on", "yes"),
+        inference_batching=INFERENCE_BATCHING,
+        cpu_threads=THREAD_BUDGET.cores,
+        concurrent_jobs=THREAD_BUDGET.concurrent_jobs,
     )
-    run_pipeline(mix_path, tgt_path, out, cfg)
-    return RunResponse(
-        target_audio=str(out / "target_speaker.wav"),
-        diarization_json=str(out / "diarization.json"),
-    )
+
+
+async def _submit(request: Request):
+    """Reserve a job, stream the uploads into its input directory and queue it."""
+    try:
+        job = jobs.create()
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    try:
+        fields, files = await receive_form(request, job.input_dir, UPLOAD_FIELDS)
+        cfg = _form_config(fields)
+        jobs.set_out_dir(job, fields.get("out_dir"))
+    except UploadTooLargeError as e:
+        jobs.discard(job)
+        raise HTTPException(status_code=413, detail=str(e))
+    except (FormError, InvalidOutputDir) as e:
+        jobs.discard(job)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        jobs.discard(job)
+        raise
+    jobs.submit(job, files["mixture"], files["target"], cfg)
+    return job
+
+
+def _get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/run", response_model=RunResponse, openapi_extra=_FORM_SCHEMA)
+async def run(request: Request):
+    """Run offline pipeline on uploaded files and wait for the result."""
+    job = await _submit(request)
+    await asyncio.wait([asyncio.wrap_future(job.future)])
+    if job.future.cancelled() or job.future.exception() is not None:
+        raise HTTPException(status_code=500, detail=f"Pipeline {job.status}" + (f": {job.error}" if job.error else ""))
+    return _result(job.out_dir)
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202, openapi_extra=_FORM_SCHEMA)
+async def submit_job(request: Request):
+    """Queue a pipeline run and return its job ID immediately."""
+    job = await _submit(request)
+    return JobResponse(**job.to_dict())
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def job_status(job_id: str):
+    return JobResponse(**_get_job(job_id).to_dict())
+
+
+@app.get("/jobs/{job_id}/result", response_model=RunResponse)
+async def job_result(job_id: str):
+    job = _get_job(job_id)
+    if job.status != SUCCEEDED:
+        detail = f"Job is {job.status}" + (f": {job.error}" if job.error else "")
+        raise HTTPException(status_code=409, detail=detail)
+    return _result(job.out_dir)
+
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    if job.status not in FINISHED_STATES:
+        jobs.cancel(job_id)
+    return JobResponse(**job.to_dict())
+
+
+@app.get("/ready")
+async def ready():
+    """200 once every model has warmed up; 503 while warm-up runs or if any
+    model failed to load (listed under "failed"). For load balancer checks."""
+    body = {"ready": is_ready(), "models": warmup_status(), "failed": failed_models()}
+    if not body["ready"]:
+        return JSONResponse(body, status_code=503)
+    return body
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of pipeline, model and queue metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,147 @@
+"""
+Multi-resolution min/max waveform envelope.
+
+Level 0 holds the min and max of every `base_block` samples; each further
+level merges `factor` bins of the previous one, until a level has at most
+`top_bins` bins. Levels are written as separate .npy files next to the
+pipeline outputs and memory-mapped on load, so a viewer reads at most
+`max_bins` bins (plus the coarsest level when zoomed all the way out) for
+any zoom range, whatever the recording length.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+ENVELOPE_DIR = "waveform_envelope"
+
+
+def _minmax_blocks(x: np.ndarray, block: int) -> np.ndarray:
+    """(n_bins, 2) float32 min/max over consecutive blocks; the tail forms a short last bin."""
+    n_full = len(x) // block
+    tail = len(x) - n_full * block
+    out = np.empty((n_full + (1 if tail else 0), 2), dtype=np.float32)
+    if n_full:
+        blocks = x[: n_full * block].reshape(n_full, block)
+        out[:n_full, 0] = blocks.min(axis=1)
+        out[:n_full, 1] = blocks.max(axis=1)
+    if tail:
+        out[-1] = (x[-tail:].min(), x[-tail:].max())
+    return out
+
+
+def _merge_bins(env: np.ndarray, factor: int) -> np.ndarray:
+    n_full = len(env) // factor
+    tail = len(env) - n_full * factor
+    out = np.empty((n_full + (1 if tail else 0), 2), dtype=np.float32)
+    if n_full:
+        grouped = env[: n_full * factor].reshape(n_full, factor, 2)
+        out[:n_full, 0] = grouped[:, :, 0].min(axis=1)
+        out[:n_full, 1] = grouped[:, :, 1].max(axis=1)
+    if tail:
+        out[-1] = (env[-tail:, 0].min(), env[-tail:, 1].max())
+    return out
+
+
+def build_envelope_pyramid(
+    wav: np.ndarray, base_block: int = 256, factor: int = 4, top_bins: int = 1024
+) -> List[np.ndarray]:
+    if len(wav) == 0:
+        return [np.zeros((0, 2), dtype=np.float32)]
+    levels = [_minmax_blocks(wav, base_block)]
+    while len(levels[-1]) > top_bins:
+        levels.append(_merge_bins(levels[-1], factor))
+    return levels
+
+
+def write_envelope(out_dir: Path, wav: np.ndarray, sr: int, base_block: int = 256, factor: int = 4) -> Path:
+    env_dir = out_dir / ENVELOPE_DIR
+    env_dir.mkdir(parents=True, exist_ok=True)
+    levels = build_envelope_pyramid(wav, base_block=base_block, factor=factor)
+    meta: Dict = {
+        "sample_rate": sr,
+        "duration": len(wav) / sr,
+        "base_block": base_block,
+        "factor": factor,
+        "levels": [],
+    }
+    for i, env in enumerate(levels):
+        np.save(env_dir / f"level_{i}.npy", env)
+        meta["levels"].append({"level": i, "samples_per_bin": base_block * factor ** i, "bins": len(env)})
+    (env_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return env_dir
+
+
+class EnvelopePyramid:
+    def __init__(self, env_dir: Path):
+        self.meta = json.loads((env_dir / "meta.json").read_text(encoding="utf-8"))
+        self.sample_rate = int(self.meta["sample_rate"])
+        self.duration = float(self.meta["duration"])
+        self.levels = [
+            np.load(env_dir / f"level_{lv['level']}.npy", mmap_mode="r") for lv in self.meta["levels"]
+        ]
+
+    def bin_seconds(self, level: int) -> float:
+        return self.meta["levels"][level]["samples_per_bin"] / self.sample_rate
+
+    def choose_level(self, t0: float, t1: float, max_bins: int = 2000) -> int:
+        """Finest level that shows [t0, t1] in at most `max_bins` bins."""
+        span = max(t1 - t0, 0.0)
+        for i in range(len(self.levels)):
+            # +2 leaves room for the partial bins at both window edges
+            if span / self.bin_seconds(i) + 2 <= max_bins:
+                return i
+        return len(self.levels) - 1
+
+    def window(self, t0: float, t1: float, max_bins: int = 2000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (bin start times, mins, maxs) covering [t0, t1] at the chosen level."""
+        level = self.choose_level(t0, t1, max_bins)
+        env = self.levels[level]
+        step = self.bin_seconds(level)
+        i0 = max(0, int(np.floor(t0 / step)))
+        i1 = min(len(env), int(np.ceil(t1 / step)) + 1)
+        block = np.asarray(env[i0:i1])
+        if len(block) > max_bins:
+            # Coarsest stored level is still too fine for this window; merge the few bins left
+            k = int(np.ceil(len(block) / max_bins))
+            block = _merge_bins(block, k)
+            step *= k
+        times = (i0 * self.bin_seconds(level) + np.arange(len(block)) * step).astype(np.float32)
+        return times, block[:, 0], block[:, 1]
+
+
+def load_envelope(out_dir: Path) -> EnvelopePyramid:
+    return EnvelopePyramid(out_dir / ENVELOPE_DIR)
+
+
+def speaker_spans(segments: List[Dict], t0: float, t1: float, max_bins: int = 2000) -> List[Tuple[float, float, str]]:
+    """Speaker overlay for [t0, t1] as at most `max_bins` (start, end, speaker) spans.
+
+    The window is cut into `max_bins` equal bins, each bin takes the speaker of
+    the segment covering its centre, and runs of bins with the same speaker
+    become one span. Adjacent same-speaker segments therefore merge, and the
+    overlay stays within the waveform's bin budget however many segments fall
+    in the window. Segments are assumed not to overlap (as the pipeline emits them).
+    """
+    visible = sorted((s for s in segments if s["end"] > t0 and s["start"] < t1), key=lambda s: s["start"])
+    if not visible or t1 <= t0:
+        return []
+    step = (t1 - t0) / max_bins
+    centres = t0 + (np.arange(max_bins) + 0.5) * step
+    starts = np.array([s["start"] for s in visible], dtype=np.float64)
+    ends = np.array([s["end"] for s in visible], dtype=np.float64)
+    names = sorted({str(s.get("speaker", "Other")) for s in visible})
+    codes = np.array([names.index(str(s.get("speaker", "Other"))) for s in visible])
+
+    idx = np.searchsorted(starts, centres, side="right") - 1
+    covered = (idx >= 0) & (centres < ends[np.maximum(idx, 0)])
+    labels = np.where(covered, codes[np.maximum(idx, 0)], -1)
+
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(labels)) + 1, [max_bins]))
+    return [
+        (t0 + b0 * step, t0 + b1 * step, names[labels[b0]])
+        for b0, b1 in zip(bounds[:-1], bounds[1:])
+        if labels[b0] >= 0
+    ]
@@ -1,33 +1,83 @@
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Tuple, Union
 
 import numpy as np
 
+from app.utils.tracing import span
+
+
+AudioSource = Union[Path, BinaryIO]
+
+_RESAMPLE_BLOCK = 1 << 20
+
 
 def _resample_naive(data: np.ndarray, src_sr: int, target_sr: int) -> Tuple[np.ndarray, int]:
     if src_sr == target_sr:
-        return data.astype(np.float32), src_sr
+        return data.astype(np.float32, copy=False), src_sr
     import math
     ratio = target_sr / src_sr
     new_len = int(math.ceil(len(data) * ratio))
-    x = np.linspace(0, 1, len(data), endpoint=False)
-    xi = np.linspace(0, 1, new_len, endpoint=False)
-    data = np.interp(xi, x, data).astype(np.float32)
-    return data, target_sr
+    out = np.empty(new_len, dtype=np.float32)
+    if len(data) == 0:
+        return out, target_sr
+    # Linear interpolation in fixed-size blocks so the float64 index arrays
+    # stay small instead of scaling with the recording length.
+    step = len(data) / new_len
+    last = len(data) - 1
+    for j0 in range(0, new_len, _RESAMPLE_BLOCK):
+        j1 = min(j0 + _RESAMPLE_BLOCK, new_len)
+        pos = np.arange(j0, j1, dtype=np.float64) * step
+        i0 = np.minimum(pos.astype(np.int64), last)
+        i1 = np.minimum(i0 + 1, last)
+        frac = np.where(i0 < last, pos - i0, 0.0)
+        out[j0:j1] = data[i0] * (1.0 - frac) + data[i1] * frac
+    return out, target_sr
+
+
+def _source_ext(source: AudioSource) -> str:
+    name = str(source) if isinstance(source, Path) else str(getattr(source, "name", "") or "")
+    return Path(name).suffix.lower().lstrip(".")
+
+
+def _rewind(source: AudioSource) -> AudioSource:
+    if not isinstance(source, Path):
+        source.seek(0)
+    return source
+
+
+def _read_soundfile(source: AudioSource) -> Tuple[np.ndarray, int]:
+    """Decode straight to mono float32, downmixing in blocks so multichannel
+    input never materializes as a full (frames, channels) float64 array."""
+    import soundfile as sf
+
+    src = str(source) if isinstance(source, Path) else source
+    with sf.SoundFile(src) as f:
+        sr = f.samplerate
+        if f.channels == 1:
+            return f.read(dtype="float32"), sr
+        frames = f.frames if f.frames > 0 else None
+        if frames is None:
+            data = f.read(dtype="float32", always_2d=True)
+            return data.mean(axis=1, dtype=np.float32), sr
+        out = np.empty(frames, dtype=np.float32)
+        pos = 0
+        for block in f.blocks(blocksize=65536, dtype="float32", always_2d=True):
+            n = len(block)
+            out[pos:pos + n] = block.mean(axis=1, dtype=np.float32)
+            pos += n
+        return out[:pos], sr
 
 
-def load_mono_audio(path: Path, target_sr: int = 16000) -> Tuple[np.ndarray, int]:
+def load_mono_audio(path: AudioSource, target_sr: int = 16000) -> Tuple[np.ndarray, int]:
     """Load audio as mono float32 [-1,1] at target_sr.
+    `path` may be a filesystem path or a seekable binary buffer (decoded in memory).
     Tries soundfile for WAV/FLAC, then librosa for MP3/others, finally raw wave module.
     """
-    ext = path.suffix.lower().lstrip(".")
+    ext = _source_ext(path)
     # 1) Try soundfile first (fast, high quality)
     try:
-        import soundfile as sf
-        data, sr = sf.read(str(path), always_2d=False)
-        if hasattr(data, "ndim") and data.ndim > 1:
-            data = data.mean(axis=1)
-        data = data.astype(np.float32)
+        with span("audio:decode_soundfile"):
+            data, sr = _read_soundfile(_rewind(path))
     except Exception:
         data = None
         sr = 0
@@ -37,8 +87,10 @@ def load_mono_audio(path: Path, target_sr: int = 16000) -> Tuple[np.ndarray, int
         try:
             import librosa  # type: ignore
 
-            y, sr2 = librosa.load(str(path), sr=None, mono=True)
-            data = y.astype(np.float32)
+            src = str(path) if isinstance(path, Path) else _rewind(path)
+            with span("audio:decode_librosa"):
+                y, sr2 = librosa.load(src, sr=None, mono=True)
+            data = y.astype(np.float32, copy=False)
             sr = int(sr2)
         except Exception:
             pass
@@ -48,7 +100,8 @@ def load_mono_audio(path: Path, target_sr: int = 16000) -> Tuple[np.ndarray, int
         try:
             import wave
 
-            with wave.open(str(path), "rb") as w:
+            src = str(path) if isinstance(path, Path) else _rewind(path)
+            with wave.open(src, "rb") as w:
                 sr = w.getframerate()
                 n = w.getnframes()
                 raw = w.readframes(n)
@@ -57,8 +110,9 @@ def load_mono_audio(path: Path, target_sr: int = 16000) -> Tuple[np.ndarray, int
         except Exception as e:
             raise RuntimeError(f"Failed to load audio: {path} ({e})")
 
-    data = data.astype(np.float32)
-    data, sr = _resample_naive(data, sr, target_sr)
+    data = data.astype(np.float32, copy=False)
+    with span("audio:resample", src_sr=sr, target_sr=target_sr):
+        data, sr = _resample_naive(data, sr, target_sr)
     return data, sr
 
 
@@ -66,4 +120,4 @@ def write_wav(path: Path, wav: np.ndarray, sr: int) -> None:
     import soundfile as sf
 
     path.parent.mkdir(parents=True, exist_ok=True)
-    sf.write(str(path), wav.astype(np.float32), sr)
+    sf.write(str(path), wav.astype(np.float32, copy=False), sr)
@@ -1,77 +1,242 @@
 import argparse
 import json
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from app.audio.io import load_mono_audio, write_wav
+from app.audio.io import AudioSource
 from app.pipeline.config import PipelineConfig
-from app.pipeline.embedding import get_speaker_embedding
-from app.pipeline.vad import detect_speech_intervals
-from app.pipeline.diarization import label_segments_by_similarity, assemble_audio
-from app.pipeline.asr import transcribe_segments
 from app.utils.logging import get_logger
+from app.utils.memory import StageMemory
+from app.utils.metrics import (
+    AUDIO_SECONDS,
+    REAL_TIME_FACTOR,
+    RUNS,
+    STAGE_RSS_DELTA,
+    STAGE_RSS_PEAK,
+    STAGE_SECONDS,
+)
+from app.utils.threads import apply_thread_budget, effective_threads, ensure_thread_budget, plan_threads
+from app.utils.tracing import Tracer, activate, maybe_profile, span
 
 
 log = get_logger(__name__)
 
+STAGES = ("load", "embed", "vad", "segment", "label", "assemble", "asr")
 
-def run_pipeline(mixture_path: Path, target_path: Path, out_dir: Path, cfg: PipelineConfig) -> None:
-    import time
+
+@contextmanager
+def _stage(name: str, summary: Dict, report: Callable[[str], None], cfg: PipelineConfig) -> Iterator[None]:
+    """Announce a stage, time it (and account its memory) and record it in the
+    run summary and metrics."""
+    report(name)
+    mem = StageMemory(top_n=cfg.tracemalloc_top) if cfg.memory_accounting else None
+    t0 = time.perf_counter()
+    try:
+        with span(f"stage:{name}"), maybe_profile(name), (mem or nullcontext()):
+            yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        summary["stages"][name] = {"seconds": round(elapsed, 4)}
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if mem is not None:
+            summary["stages"][name].update(mem.as_dict())
+            if mem.peak is not None:
+                STAGE_RSS_PEAK.observe(mem.peak, stage=name)
+                STAGE_RSS_DELTA.observe(max(0, mem.peak - (mem.before or 0)), stage=name)
+
+
+def run_pipeline(
+    mixture_path: AudioSource,
+    target_path: AudioSource,
+    out_dir: Path,
+    cfg: PipelineConfig,
+    progress: Optional[Callable[[str], None]] = None,
+    on_segment: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Run the full pipeline. Inputs may be paths or in-memory audio buffers.
+    `progress`, if given, is called with the name of each stage as it starts;
+    raising from it aborts the run. `on_segment` receives every entry of
+    diarization.json exactly once: transcript entries as ASR produces them,
+    then any untranscribed non-target segments. Returns the run summary, which is also written
+    to run_summary.json."""
     out_dir.mkdir(parents=True, exist_ok=True)
-    
-    start_time = time.time()
+    report = progress or (lambda stage: None)
+    ensure_thread_budget(cfg)
+    summary: Dict = {"stages": {}, "threads": effective_threads()}
+    tracer = None
+    if cfg.trace or cfg.profile_stages:
+        tracer = Tracer(profile_stages=cfg.profile_stages, profile_dir=out_dir)
+    start_time = time.perf_counter()
+    try:
+        with activate(tracer), span("run_pipeline"):
+            _run_stages(mixture_path, target_path, out_dir, cfg, report, summary, on_segment)
+    except Exception:
+        RUNS.inc(status="failed")
+        raise
+    finally:
+        if tracer is not None:
+            summary["trace"] = str(tracer.export(out_dir / "trace.json"))
+    RUNS.inc(status="succeeded")
+    if cfg.profile_stages:
+        summary["profiles"] = [str(out_dir / f"profile_{s}.prof") for s in cfg.profile_stages if s in summary["stages"]]
+
+    total = time.perf_counter() - start_time
+    audio_sec = summary.get("audio_seconds", 0.0)
+    summary["total_seconds"] = round(total, 4)
+    peaks = [s["rss_peak_mb"] for s in summary["stages"].values() if s.get("rss_peak_mb") is not None]
+    if peaks:
+        summary["peak_rss_mb"] = max(peaks)
+    summary["real_time_factor"] = round(total / audio_sec, 4) if audio_sec else None
+    if audio_sec:
+        REAL_TIME_FACTOR.observe(total / audio_sec)
+        AUDIO_SECONDS.inc(audio_sec)
+    summary_out = out_dir / "run_summary.json"
+    summary_out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    log.info(
+        f"Pipeline finished in {total:.1f}s (RTF {summary['real_time_factor']}, peak RSS {summary.get('peak_rss_mb')} MB)"
+    )
+    return summary
+
+
+def _run_stages(
+    mixture_path: AudioSource,
+    target_path: AudioSource,
+    out_dir: Path,
+    cfg: PipelineConfig,
+    report: Callable[[str], None],
+    summary: Dict,
+    on_segment: Optional[Callable[[Dict], None]] = None,
+) -> None:
+    # Pipeline modules (and the model libraries behind them) load on first run,
+    # which keeps `--help`, API start-up and plain imports of app.main fast
+    from app.audio.envelope import write_envelope
+    from app.audio.io import load_mono_audio, write_wav
+    from app.pipeline.asr import transcribe_segments
+    from app.pipeline.diarization import assemble_audio, cascade_summary, label_segments_by_similarity
+    from app.pipeline.embedding import get_speaker_embedding
+    from app.pipeline.segmentation import split_long_intervals
+    from app.pipeline.vad import detect_speech_intervals
+
+    stages = summary["stages"]
+
     log.info("Loading audio files...")
-    wav_mix, sr_mix = load_mono_audio(mixture_path, target_sr=cfg.sample_rate)
-    wav_tgt, sr_tgt = load_mono_audio(target_path, target_sr=cfg.sample_rate)
-    log.info(f"Audio loaded ({time.time()-start_time:.1f}s) - Mixture: {len(wav_mix)/cfg.sample_rate:.1f}s, Target: {len(wav_tgt)/cfg.sample_rate:.1f}s")
+    with _stage("load", summary, report, cfg):
+        wav_mix, sr_mix = load_mono_audio(mixture_path, target_sr=cfg.sample_rate)
+        wav_tgt, sr_tgt = load_mono_audio(target_path, target_sr=cfg.sample_rate)
+    summary["audio_seconds"] = round(len(wav_mix) / cfg.sample_rate, 3)
+    log.info(f"Audio loaded ({stages['load']['seconds']:.1f}s) - Mixture: {len(wav_mix)/cfg.sample_rate:.1f}s, Target: {len(wav_tgt)/cfg.sample_rate:.1f}s")
 
     if sr_mix != cfg.sample_rate:
         log.warning(f"Mixture resampled to {cfg.sample_rate} Hz")
     if sr_tgt != cfg.sample_rate:
         log.warning(f"Target resampled to {cfg.sample_rate} Hz")
 
-    step_start = time.time()
     log.info("Computing target speaker embedding...")
-    tgt_emb = get_speaker_embedding(wav_tgt, cfg.sample_rate, device=cfg.device)
-    log.info(f"Embedding computed ({time.time()-step_start:.1f}s)")
+    with _stage("embed", summary, report, cfg):
+        tgt_emb = get_speaker_embedding(wav_tgt, cfg.sample_rate, device=cfg.device)
+    log.info(f"Embedding computed ({stages['embed']['seconds']:.1f}s)")
 
-    step_start = time.time()
     log.info("Detecting speech intervals (VAD)...")
-    intervals = detect_speech_intervals(
-        wav_mix, cfg.sample_rate, frame_ms=cfg.vad_frame_ms, aggressiveness=cfg.vad_aggressiveness
-    )
+    with _stage("vad", summary, report, cfg):
+        intervals = detect_speech_intervals(
+            wav_mix, cfg.sample_rate, frame_ms=cfg.vad_frame_ms, aggressiveness=cfg.vad_aggressiveness
+        )
     if not intervals:
         log.warning("No speech detected in mixture")
-    log.info(f"VAD complete ({time.time()-step_start:.1f}s) - Found {len(intervals)} intervals")
+    log.info(f"VAD complete ({stages['vad']['seconds']:.1f}s) - Found {len(intervals)} intervals")
+
+    with _stage("segment", summary, report, cfg):
+        segments = split_long_intervals(
+            wav_mix, cfg.sample_rate, intervals, max_sec=cfg.max_segment_sec, target_sec=cfg.target_segment_sec
+        )
+    summary["vad_intervals"] = len(intervals)
+    if len(segments) != len(intervals):
+        log.info(f"Split intervals longer than {cfg.max_segment_sec:g}s - {len(intervals)} intervals -> {len(segments)} segments")
+
+    embed_batcher = whisper_batcher = None
+    if cfg.inference_batching:
+        from app.pipeline import batching
+
+        embed_batcher = batching.embedding_batcher(
+            cfg.sample_rate, cfg.device, cfg.batch_max_size, cfg.batch_max_wait_ms
+        )
+        if cfg.asr_backend == "whisper":
+            whisper_batcher = batching.asr_batcher(
+                cfg.sample_rate, cfg.asr_model, cfg.batch_max_size, cfg.batch_max_wait_ms
+            )
 
-    step_start = time.time()
     log.info("Scoring segments by target similarity...")
-    labeled = label_segments_by_similarity(
-        wav_mix, cfg.sample_rate, intervals, tgt_emb, threshold=cfg.target_threshold, device=cfg.device
-    )
+    with _stage("label", summary, report, cfg):
+        labeled = label_segments_by_similarity(
+            wav_mix,
+            cfg.sample_rate,
+            segments,
+            tgt_emb,
+            threshold=cfg.target_threshold,
+            device=cfg.device,
+            cluster_others=cfg.cluster_other_speakers,
+            cluster_threshold=cfg.speaker_cluster_threshold,
+            max_speakers=cfg.max_speakers,
+            batcher=embed_batcher,
+            cascade_excerpt_sec=cfg.cascade_excerpt_sec,
+            cascade_band=cfg.cascade_band,
+            cascade_audit=cfg.cascade_audit,
+        )
     target_count = len([s for s in labeled if s["speaker"] == "Target"])
-    log.info(f"Diarization complete ({time.time()-step_start:.1f}s) - {target_count} Target, {len(labeled)-target_count} Other")
+    summary["segments"] = {"total": len(labeled), "target": target_count}
+    log.info(f"Diarization complete ({stages['label']['seconds']:.1f}s) - {target_count} Target, {len(labeled)-target_count} Other")
+    if cfg.cluster_other_speakers:
+        n_other = len({s["speaker"] for s in labeled if s["speaker"] not in ("Target", "Other")})
+        summary["segments"]["other_speakers"] = n_other
+        log.info(f"Clustered non-target segments into {n_other} speakers")
+    if cfg.cascade_excerpt_sec > 0:
+        cascade = summary["cascade"] = cascade_summary(labeled, cfg.target_threshold)
+        log.info(
+            f"Cascade: {cascade['early_exit']}/{cascade['segments']} segments exited early on a "
+            f"{cfg.cascade_excerpt_sec:g}s excerpt"
+            + (f", {cascade['agreement']:.1%} agreement over {cascade['audited']} audited" if cascade["audited"] else "")
+        )
 
-    step_start = time.time()
     log.info("Assembling target speaker audio...")
-    tgt_audio = assemble_audio(wav_mix, cfg.sample_rate, labeled, speaker_label="Target")
-    target_out = out_dir / "target_speaker.wav"
-    write_wav(target_out, tgt_audio, cfg.sample_rate)
+    with _stage("assemble", summary, report, cfg):
+        tgt_audio = assemble_audio(wav_mix, cfg.sample_rate, labeled, speaker_label="Target")
+        target_out = out_dir / "target_speaker.wav"
+        with span("assemble:write_wav"):
+            write_wav(target_out, tgt_audio, cfg.sample_rate)
+        if cfg.write_waveform_envelope:
+            with span("assemble:envelope"):
+                write_envelope(out_dir, wav_mix, cfg.sample_rate)
     log.info(f"Wrote {target_out}")
 
     log.info("Transcribing per segment with ASR")
     # Optionally filter to only transcribe target speaker (much faster)
     segments_to_transcribe = [s for s in labeled if s["speaker"] == "Target"] if cfg.transcribe_only_target else labeled
     log.info(f"Transcribing {len(segments_to_transcribe)} segments ({len([s for s in segments_to_transcribe if s['speaker']=='Target'])} Target)")
-    
-    diarization_entries = transcribe_segments(
-        wav_mix, cfg.sample_rate, segments_to_transcribe, backend=cfg.asr_backend, model_size=cfg.asr_model
-    )
-    
+
+    with _stage("asr", summary, report, cfg):
+        diarization_entries = transcribe_segments(
+            wav_mix,
+            cfg.sample_rate,
+            segments_to_transcribe,
+            backend=cfg.asr_backend,
+            model_size=cfg.asr_model,
+            batcher=whisper_batcher,
+            on_segment=on_segment,
+        )
+    log.info(f"ASR complete ({stages['asr']['seconds']:.1f}s)")
+    if cfg.inference_batching:
+        # Batchers are shared by all jobs, so these cover every request since start-up
+        summary["batching"] = {b.name: b.stats() for b in (embed_batcher, whisper_batcher) if b is not None}
+
     # If we only transcribed target, add back Other segments with empty text
     if cfg.transcribe_only_target:
         other_segments = [{"speaker": s["speaker"], "start": s["start"], "end": s["end"], "text": "", "confidence": 0.0} 
                          for s in labeled if s["speaker"] != "Target"]
+        if on_segment is not None:
+            for entry in other_segments:
+                on_segment(entry)
         diarization_entries = sorted(diarization_entries + other_segments, key=lambda x: x["start"])
 
     diar_out = out_dir / "diarization.json"
@@ -79,7 +244,20 @@ def run_pipeline(mixture_path: Path, target_path: Path, out_dir: Path, cfg: Pipe
     log.info(f"Wrote {diar_out}")
 
 
-def parse_args() -> argparse.Namespace:
+def _stage_list(value: str) -> List[str]:
+    """argparse type for --profile: comma-separated stage names, or "all"."""
+    if value.strip() == "all":
+        return list(STAGES)
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s) {', '.join(unknown) or repr(value)}; choose from {', '.join(STAGES)} or all"
+        )
+    return stages
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Target Speaker Diarization + ASR (baseline)")
     p.add_argument("mixture", type=Path, help="Path to multi-speaker WAV file")
     p.add_argument("target", type=Path, help="Path to target speaker reference WAV (3-10s)")
@@ -88,7 +266,25 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--asr-model", default="tiny", help="Whisper model size (e.g., tiny, base, small)")
     p.add_argument("--device", default="cpu", help="torch device: cpu or cuda")
     p.add_argument("--threshold", type=float, default=0.6, help="Target similarity threshold [0-1]")
-    return p.parse_args()
+    p.add_argument("--cluster-speakers", action="store_true", help="Split non-target segments into Speaker_1..N")
+    p.add_argument("--cluster-threshold", type=float, default=0.5, help="Similarity needed to join an existing speaker [0-1]")
+    p.add_argument("--max-speakers", type=int, default=None, help="Upper bound on non-target speakers when clustering")
+    p.add_argument("--cascade", type=float, default=0.0, metavar="SEC", help="Score a SEC-second excerpt first; embed in full only near the threshold")
+    p.add_argument("--cascade-band", type=float, default=0.1, help="Excerpt scores within this distance of the threshold get a full embedding")
+    p.add_argument("--cascade-audit", type=float, default=0.0, help="Fraction of early exits also scored in full to report agreement")
+    p.add_argument("--max-segment", type=float, default=0.0, help="Split speech intervals longer than this many seconds, e.g. 12 (default 0 = off)")
+    p.add_argument("--batch", action="store_true", help="Micro-batch embedding and ASR inference")
+    p.add_argument("--threads", type=int, default=0, help="CPU threads for inference (default: all available cores)")
+    p.add_argument("--tracemalloc", type=int, default=0, metavar="N", help="Report the top N allocation sites per stage")
+    p.add_argument("--trace", action="store_true", help="Write a Chrome/Perfetto trace.json to the output dir")
+    p.add_argument(
+        "--profile",
+        type=_stage_list,
+        default=[],
+        metavar="STAGES",
+        help=f"cProfile these comma-separated stages ({','.join(STAGES)}, or all) into profile_<stage>.prof",
+    )
+    return p.parse_args(argv)
 
 
 def main() -> None:
@@ -98,7 +294,20 @@ def main() -> None:
         asr_model=args.asr_model,
         device=args.device,
         target_threshold=args.threshold,
+        cluster_other_speakers=args.cluster_speakers,
+        speaker_cluster_threshold=args.cluster_threshold,
+        max_speakers=args.max_speakers,
+        max_segment_sec=args.max_segment,
+        cascade_excerpt_sec=args.cascade,
+        cascade_band=args.cascade_band,
+        cascade_audit=args.cascade_audit,
+        inference_batching=args.batch,
+        cpu_threads=args.threads,
+        trace=args.trace,
+        tracemalloc_top=args.tracemalloc,
+        profile_stages=args.profile,
     )
+    apply_thread_budget(plan_threads(cfg))
     run_pipeline(args.mixture, args.target, args.out, cfg)
 
 
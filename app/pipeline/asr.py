@@ -1,16 +1,32 @@
-from typing import List, Dict
+import threading
+from typing import Callable, Dict, List, Optional
 
 import numpy as np
 
+from app.utils.metrics import MODEL_CACHE_HITS, MODEL_LOADS, SEGMENT_SECONDS
+from app.utils.threads import configure_torch
+from app.utils.tracing import span
+
 _WHISPER_MODELS = {}
+_LOAD_LOCK = threading.Lock()
+# Checkpoint names accepted by whisper.load_model
+WHISPER_MODEL_SIZES = (
+    "tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en",
+    "large", "large-v1", "large-v2", "large-v3", "large-v3-turbo", "turbo",
+)
 
 
 def _get_whisper_model(model_size: str):
     import whisper
 
-    if model_size not in _WHISPER_MODELS:
-        _WHISPER_MODELS[model_size] = whisper.load_model(model_size)
-    return _WHISPER_MODELS[model_size]
+    configure_torch()
+    with _LOAD_LOCK:
+        if model_size not in _WHISPER_MODELS:
+            _WHISPER_MODELS[model_size] = whisper.load_model(model_size)
+            MODEL_LOADS.inc(model=f"whisper-{model_size}")
+        else:
+            MODEL_CACHE_HITS.inc(model=f"whisper-{model_size}")
+        return _WHISPER_MODELS[model_size]
 
 
 def _asr_whisper_segment(wav_seg: np.ndarray, sr: int, model_size: str = "tiny") -> Dict:
@@ -30,21 +46,23 @@ def _asr_whisper_segment(wav_seg: np.ndarray, sr: int, model_size: str = "tiny")
     
     # Resample to 16kHz if needed
     if sr != 16000:
-        import math
-        ratio = 16000 / sr
-        new_len = int(math.ceil(len(wav_seg) * ratio))
-        x = np.linspace(0, 1, len(wav_seg), endpoint=False)
-        xi = np.linspace(0, 1, new_len, endpoint=False)
-        wav_seg = np.interp(xi, x, wav_seg).astype(np.float32)
+        with span("asr:resample"):
+            import math
+            ratio = 16000 / sr
+            new_len = int(math.ceil(len(wav_seg) * ratio))
+            x = np.linspace(0, 1, len(wav_seg), endpoint=False)
+            xi = np.linspace(0, 1, new_len, endpoint=False)
+            wav_seg = np.interp(xi, x, wav_seg).astype(np.float32)
         sr = 16000
 
     # Create temp file with delete=False to keep it available for Whisper
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+    with span("asr:write_temp"), tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
         tmp_path = tmp.name
         sf.write(tmp_path, wav_seg, sr)
     
     try:
-        result = model.transcribe(tmp_path)
+        with span("asr:model", seconds=round(len(wav_seg) / sr, 2)):
+            result = model.transcribe(tmp_path)
         text = result.get("text", "").strip()
     finally:
         # Clean up temp file after transcription
@@ -54,6 +72,38 @@ def _asr_whisper_segment(wav_seg: np.ndarray, sr: int, model_size: str = "tiny")
     return {"text": text, "confidence": 0.0}
 
 
+def _asr_whisper_batch(segs: List[np.ndarray], sr: int, model_size: str = "tiny") -> List[Dict]:
+    """
+    Transcribe several segments with one batched Whisper decode. Segments that
+    fit Whisper's 30s window are decoded together; longer ones fall back to
+    the per-segment sliding-window path.
+    """
+    import whisper
+
+    model = _get_whisper_model(model_size)
+    results: List[Dict] = [{"text": "", "confidence": 0.0} for _ in segs]
+    short_idx = []
+    mels = []
+    for i, seg in enumerate(segs):
+        if sr != 16000 or len(seg) > whisper.audio.N_SAMPLES:
+            results[i] = _asr_whisper_segment(seg, sr, model_size=model_size)
+            continue
+        with span("asr:log_mel"):
+            audio = whisper.pad_or_trim(np.asarray(seg, dtype=np.float32))
+            mels.append(whisper.log_mel_spectrogram(audio, n_mels=model.dims.n_mels).to(model.device))
+        short_idx.append(i)
+
+    if mels:
+        import torch
+
+        options = whisper.DecodingOptions(fp16=model.device.type != "cpu")
+        with span("asr:batch_decode", size=len(mels)), torch.no_grad():
+            decoded = whisper.decode(model, torch.stack(mels), options)
+        for i, r in zip(short_idx, decoded):
+            results[i] = {"text": r.text.strip(), "confidence": 0.0}
+    return results
+
+
 def transcribe_segments(
     wav: np.ndarray,
     sr: int,
@@ -61,12 +111,27 @@ def transcribe_segments(
     backend: str = "whisper",
     model_size: str = "tiny",
     min_duration: float = 0.5,
+    batcher=None,
+    on_segment: Optional[Callable[[Dict], None]] = None,
 ) -> List[Dict]:
+    """
+    Transcribe each labeled segment. With a `batcher` (see app.pipeline.batching),
+    all segments are submitted up front and decoded in shared micro-batches.
+    `on_segment`, if given, receives every entry (including skipped short
+    segments, with empty text) as soon as it is ready.
+    """
     import logging
     logger = logging.getLogger(__name__)
     
     entries: List[Dict] = []
     total = len(labeled)
+
+    pending = {}
+    if batcher is not None and backend == "whisper":
+        for idx, item in enumerate(labeled, 1):
+            if item["end"] - item["start"] >= min_duration:
+                seg = wav[int(item["start"] * sr):int(item["end"] * sr)]
+                pending[idx] = batcher.submit(seg)
     
     for idx, item in enumerate(labeled, 1):
         duration = item["end"] - item["start"]
@@ -80,6 +145,8 @@ def transcribe_segments(
                 "text": "",
                 "confidence": 0.0,
             })
+            if on_segment is not None:
+                on_segment(entries[-1])
             continue
         
         s = int(item["start"] * sr)
@@ -92,7 +159,12 @@ def transcribe_segments(
             try:
                 if idx % 10 == 0:
                     logger.info(f"Transcribing segment {idx}/{total} ({duration:.1f}s)")
-                r = _asr_whisper_segment(seg, sr, model_size=model_size)
+                if idx in pending:
+                    with span("asr:wait_batch", index=idx):
+                        r = pending[idx].result()
+                else:
+                    with SEGMENT_SECONDS.time(stage="asr"), span("asr:segment", index=idx):
+                        r = _asr_whisper_segment(seg, sr, model_size=model_size)
                 text = r.get("text", "")
                 conf = float(r.get("confidence", 0.0))
             except Exception as ex:
@@ -109,6 +181,8 @@ def transcribe_segments(
                 "confidence": conf,
             }
         )
+        if on_segment is not None:
+            on_segment(entries[-1])
     
     logger.info(f"Transcribed {len([e for e in entries if e['text']])} segments with text")
     return entries
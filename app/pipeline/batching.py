@@ -0,0 +1,199 @@
+"""
+Cross-request dynamic batching for model inference.
+
+A MicroBatcher owns one worker thread in front of a shared model. Callers
+from any job submit single items and get a Future back; the worker groups
+pending items into micro-batches of at most `max_batch_size`, waiting no
+longer than `max_wait_ms` after the first item arrives, and runs them in a
+single batched call. Pending items are kept per submitter (by default the
+submitting thread, i.e. one job) and batches take them round-robin, so a
+long job that submits all of its segments at once cannot starve jobs that
+arrive after it. Each item carries its submitter's active tracer, and
+the batch runs with those tracers active so spans recorded inside the model
+call land in the traces of the jobs it served.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.metrics import BATCH_SIZE, SEGMENT_SECONDS
+from app.utils.tracing import activate, current_tracer, shared_tracer, span
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+        latency_window: int = 2048,
+        stage: str = "",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self.stage = stage or name
+        # submitter -> its pending (item, future, submit time, tracer) entries
+        self._pending: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._requests = 0
+        self._batches = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name=f"{name}-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, submitter: Optional[Hashable] = None) -> Future:
+        """Queue `item` for `submitter` (default: the calling thread)."""
+        fut: Future = Future()
+        key = threading.get_ident() if submitter is None else submitter
+        with self._cond:
+            self._pending.setdefault(key, deque()).append((item, fut, time.perf_counter(), current_tracer()))
+            self._cond.notify()
+        return fut
+
+    def map(self, items: Sequence[Any], submitter: Optional[Hashable] = None) -> List[Future]:
+        """Submit every item at once so they can share batches; returns futures in order."""
+        return [self.submit(it, submitter) for it in items]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lat = np.asarray(self._latencies, dtype=np.float64)
+            requests, batches = self._requests, self._batches
+        return {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": (requests / batches) if batches else 0.0,
+            "p50_latency_ms": float(np.percentile(lat, 50) * 1000) if len(lat) else 0.0,
+            "p95_latency_ms": float(np.percentile(lat, 95) * 1000) if len(lat) else 0.0,
+        }
+
+    def close(self) -> None:
+        """Stop the worker once every pending item has been processed."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _take_round_robin(self, batch: List[Tuple]) -> None:
+        # Caller holds self._cond. One item per submitter per turn, oldest submitter first.
+        while len(batch) < self.max_batch_size and self._pending:
+            key, entries = next(iter(self._pending.items()))
+            batch.append(entries.popleft())
+            if entries:
+                self._pending.move_to_end(key)
+            else:
+                del self._pending[key]
+
+    def _collect(self) -> Tuple[List[Tuple], bool]:
+        """Next micro-batch, and whether the batcher is closed with nothing left."""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            batch: List[Tuple] = []
+            self._take_round_robin(batch)
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                self._take_round_robin(batch)
+            return batch, self._closed and not self._pending
+
+    def _run_batch(self, items: List[Any]) -> List[Any]:
+        try:
+            return self.batch_fn(items)
+        except Exception as e:
+            if len(items) == 1:
+                return [e]
+        # Retry one by one so a single bad input doesn't fail its batch-mates
+        results: List[Any] = []
+        for item in items:
+            try:
+                results.extend(self.batch_fn([item]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _loop(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            batch = [b for b in batch if b[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            # The worker thread doesn't inherit the submitters' context
+            with activate(shared_tracer(b[3] for b in batch)), span(f"{self.stage}:micro_batch", size=len(batch)):
+                results = self._run_batch([b[0] for b in batch])
+            done = time.perf_counter()
+            for (_, fut, t0, _), res in zip(batch, results):
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._latencies.extend(done - b[2] for b in batch)
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+            for b in batch:
+                SEGMENT_SECONDS.observe(done - b[2], stage=self.stage)
+
+
+_BATCHERS: Dict[Tuple, MicroBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def _get_batcher(key: Tuple, factory: Callable[[], MicroBatcher], load: Callable[[], Any]) -> MicroBatcher:
+    # One batcher per model instance; the first caller's batching limits win.
+    with _BATCHERS_LOCK:
+        if key in _BATCHERS:
+            return _BATCHERS[key]
+    # Load the model first (outside the lock): an unknown model or device fails
+    # here, before a worker thread that would never be closed is started.
+    load()
+    with _BATCHERS_LOCK:
+        if key not in _BATCHERS:
+            _BATCHERS[key] = factory()
+        return _BATCHERS[key]
+
+
+def embedding_batcher(sr: int, device: str = "cpu", max_batch_size: int = 8, max_wait_ms: float = 10.0) -> MicroBatcher:
+    from app.pipeline.embedding import _get_classifier, get_speaker_embeddings
+
+    return _get_batcher(
+        ("embedding", sr, device),
+        lambda: MicroBatcher(
+            lambda wavs: get_speaker_embeddings(wavs, sr, device=device),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name=f"embedding-{device}",
+            stage="embed",
+        ),
+        lambda: _get_classifier(device),
+    )
+
+
+def asr_batcher(sr: int, model_size: str = "tiny", max_batch_size: int = 8, max_wait_ms: float = 10.0) -> MicroBatcher:
+    from app.pipeline.asr import _asr_whisper_batch, _get_whisper_model
+
+    return _get_batcher(
+        ("asr", sr, model_size),
+        lambda: MicroBatcher(
+            lambda segs: _asr_whisper_batch(segs, sr, model_size=model_size),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name=f"asr-{model_size}",
+            stage="asr",
+        ),
+        lambda: _get_whisper_model(model_size),
+    )
+
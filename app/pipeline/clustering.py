@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+import numpy as np
+
+
+def cluster_embeddings(
+    embeddings: List[np.ndarray],
+    threshold: float = 0.5,
+    max_speakers: Optional[int] = None,
+    refine: bool = True,
+) -> List[int]:
+    """
+    Online (leader-follower) clustering of L2-normalized speaker embeddings.
+
+    Each embedding is compared against the running cluster centroids only, so
+    cost is O(n * k) for n segments and k clusters and no n x n similarity
+    matrix is ever built. A new cluster is opened when the best cosine
+    similarity falls below `threshold` (and `max_speakers` is not reached).
+    With `refine`, a second pass reassigns every embedding to its nearest
+    final centroid to undo order effects of the single online pass.
+
+    Returns a cluster index per embedding, numbered by first appearance.
+    """
+    if not embeddings:
+        return []
+
+    dim = embeddings[0].shape[-1]
+    cap = 16
+    sums = np.zeros((cap, dim), dtype=np.float64)
+    centroids = np.zeros((cap, dim), dtype=np.float64)
+    k = 0
+    assignments: List[int] = []
+
+    for emb in embeddings:
+        v = np.asarray(emb, dtype=np.float64).reshape(-1)
+        v = v / (np.linalg.norm(v) + 1e-9)
+        if k:
+            sims = centroids[:k] @ v
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold or (max_speakers is not None and k >= max_speakers):
+                sums[best] += v
+                centroids[best] = sums[best] / (np.linalg.norm(sums[best]) + 1e-9)
+                assignments.append(best)
+                continue
+        if k == cap:
+            cap *= 2
+            sums = np.resize(sums, (cap, dim))
+            centroids = np.resize(centroids, (cap, dim))
+        sums[k] = v
+        centroids[k] = v
+        assignments.append(k)
+        k += 1
+
+    if refine and k > 1:
+        final = centroids[:k]
+        # Chunked so the n x k score block stays small for long recordings
+        chunk = 4096
+        refined: List[int] = []
+        for i in range(0, len(embeddings), chunk):
+            block = np.stack([np.asarray(e, dtype=np.float64).reshape(-1) for e in embeddings[i:i + chunk]])
+            block /= np.linalg.norm(block, axis=1, keepdims=True) + 1e-9
+            refined.extend(int(j) for j in np.argmax(block @ final.T, axis=1))
+        assignments = refined
+
+    # Renumber by first appearance so Speaker_1 is the earliest speaker
+    remap = {}
+    for a in assignments:
+        if a not in remap:
+            remap[a] = len(remap)
+    return [remap[a] for a in assignments]
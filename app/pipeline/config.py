@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
@@ -7,8 +8,24 @@ class PipelineConfig:
     vad_frame_ms: int = 30
     vad_aggressiveness: int = 2  # 0..3
 
+    # Post-VAD splitting of long intervals at low-energy points; off (0) by
+    # default because it changes segment boundaries and transcripts; 12 s is a good opt-in value
+    max_segment_sec: float = 0.0
+    target_segment_sec: float = 8.0
+
     # Target speaker match
     target_threshold: float = 0.6
+    # Early-exit cascade: score a centred excerpt first and embed the full
+    # segment only within cascade_band of the threshold (0 s = off);
+    # cascade_audit re-scores that fraction of early exits to measure agreement
+    cascade_excerpt_sec: float = 0.0
+    cascade_band: float = 0.1
+    cascade_audit: float = 0.0
+
+    # Non-target speaker attribution (Speaker_1..N instead of "Other")
+    cluster_other_speakers: bool = False
+    speaker_cluster_threshold: float = 0.5
+    max_speakers: Optional[int] = None
 
     # ASR
     asr_backend: str = "whisper"
@@ -17,3 +34,25 @@ class PipelineConfig:
 
     # Torch
     device: str = "cpu"
+
+    # CPU thread budget split across concurrent jobs (see app.utils.threads)
+    cpu_threads: int = 0  # 0 = all cores available to the process
+    concurrent_jobs: int = 1
+
+    # Shared micro-batching of embedding/ASR calls (see app.pipeline.batching)
+    inference_batching: bool = False
+    batch_max_size: int = 8
+    batch_max_wait_ms: float = 10.0
+
+    # Outputs
+    write_waveform_envelope: bool = True  # min/max pyramid for the UI timeline
+
+    # Diagnostics: Chrome-trace export and cProfile of selected stages
+    trace: bool = False
+    profile_stages: List[str] = field(default_factory=list)
+    # Per-stage RSS before/after/peak; tracemalloc top-N allocation sites if > 0
+    memory_accounting: bool = True
+    tracemalloc_top: int = 0
+
+    # Models loaded and exercised at start-up (see app.pipeline.warmup)
+    warmup_models: List[str] = field(default_factory=lambda: ["ecapa", "vad", "whisper:tiny"])
@@ -1,13 +1,57 @@
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 
 import numpy as np
 
 from app.pipeline.embedding import get_speaker_embedding, cosine_sim
+from app.pipeline.clustering import cluster_embeddings
+from app.utils.metrics import CASCADE_AUDITS, CASCADE_SEGMENTS, SEGMENT_SECONDS
+from app.utils.tracing import span
 
 
 Segment = Tuple[float, float]  # (start_sec, end_sec)
 
 
+def _excerpt(seg: np.ndarray, sr: int, excerpt_sec: float) -> Optional[np.ndarray]:
+    """Centred excerpt of `excerpt_sec`, or None when the segment is short
+    enough that scoring it in full costs about the same."""
+    n = int(excerpt_sec * sr)
+    if n <= 0 or len(seg) <= n * 3 // 2:
+        return None
+    off = (len(seg) - n) // 2
+    return seg[off:off + n]
+
+
+def _embed_all(segs: List[np.ndarray], idx: List[int], sr: int, device: str, batcher) -> List[Optional[np.ndarray]]:
+    """Embeddings for `segs` (None where embedding failed). With a batcher all
+    segments are submitted up front so they share micro-batches."""
+    out: List[Optional[np.ndarray]] = []
+    if batcher is not None:
+        pending = batcher.map(segs)
+        for i, fut in zip(idx, pending):
+            try:
+                with span("label:wait_batch", index=i):
+                    out.append(fut.result())
+            except Exception:
+                out.append(None)
+        return out
+    for i, seg in zip(idx, segs):
+        try:
+            with SEGMENT_SECONDS.time(stage="embed"), span("label:embed", index=i):
+                out.append(get_speaker_embedding(seg, sr, device=device))
+        except Exception:
+            out.append(None)
+    return out
+
+
+def _score(emb: Optional[np.ndarray], target_emb: np.ndarray) -> float:
+    if emb is None:
+        return 0.0
+    try:
+        return cosine_sim(emb, target_emb)
+    except Exception:
+        return 0.0
+
+
 def label_segments_by_similarity(
     wav: np.ndarray,
     sr: int,
@@ -15,27 +59,99 @@ def label_segments_by_similarity(
     target_emb: np.ndarray,
     threshold: float = 0.6,
     device: str = "cpu",
+    cluster_others: bool = False,
+    cluster_threshold: float = 0.5,
+    max_speakers: Optional[int] = None,
+    batcher=None,
+    cascade_excerpt_sec: float = 0.0,
+    cascade_band: float = 0.1,
+    cascade_audit: float = 0.0,
 ) -> List[Dict]:
+    """
+    Label each interval "Target" or "Other" by cosine similarity to `target_emb`.
+
+    With `cluster_others`, the embeddings already computed for target matching
+    are clustered online and non-target segments are labeled Speaker_1..N
+    instead of "Other". Segments whose embedding failed stay "Other".
+    With a `batcher` (see app.pipeline.batching), all segments are submitted
+    up front and embedded in shared micro-batches.
+
+    With `cascade_excerpt_sec > 0`, segments are first scored on a centred
+    excerpt of that length; only those scoring within `cascade_band` of
+    `threshold` (or whose excerpt failed) are embedded in full. Each entry's
+    "scored_by" says which embedding decided it. `cascade_audit` is the
+    fraction of early exits that are also scored in full, without changing
+    their label, to measure agreement ("full_score"; see cascade_summary).
+    """
+    segs = [wav[int(s * sr):int(e * sr)] for (s, e) in intervals]
+    excerpts = [_excerpt(seg, sr, cascade_excerpt_sec) for seg in segs] if cascade_excerpt_sec > 0 else [None] * len(segs)
+    first = [ex if ex is not None else seg for ex, seg in zip(excerpts, segs)]
+    embs = _embed_all(first, list(range(len(segs))), sr, device, batcher)
+    scores = [_score(emb, target_emb) for emb in embs]
+    scored_by = ["full" if ex is None else "excerpt" for ex in excerpts]
+    full_scores: Dict[int, float] = {}
+
+    if cascade_excerpt_sec > 0:
+        early = [i for i, by in enumerate(scored_by) if by == "excerpt"]
+        escalate = [i for i in early if embs[i] is None or abs(scores[i] - threshold) < cascade_band]
+        escalated = set(escalate)
+        exits = [i for i in early if i not in escalated]
+        step = max(1, round(1 / cascade_audit)) if cascade_audit > 0 else 0
+        audit = exits[::step] if step else []
+        rescore = escalate + audit
+        with span("label:cascade_full", escalated=len(escalate), audited=len(audit)):
+            full = _embed_all([segs[i] for i in rescore], rescore, sr, device, batcher)
+        for i, emb in zip(escalate, full):
+            embs[i], scores[i], scored_by[i] = emb, _score(emb, target_emb), "full"
+        for i, emb in zip(audit, full[len(escalate):]):
+            full_scores[i] = _score(emb, target_emb)
+            agreed = (full_scores[i] >= threshold) == (scores[i] >= threshold)
+            CASCADE_AUDITS.inc(agreed=str(agreed).lower())
+        CASCADE_SEGMENTS.inc(len(exits), scored_by="excerpt")
+        CASCADE_SEGMENTS.inc(len(segs) - len(exits), scored_by="full")
+
     labeled: List[Dict] = []
-    for (s, e) in intervals:
-        s_i = int(s * sr)
-        e_i = int(e * sr)
-        seg = wav[s_i:e_i]
-        try:
-            emb = get_speaker_embedding(seg, sr, device=device)
-            score = cosine_sim(emb, target_emb)
-        except Exception:
-            score = 0.0
-        speaker = "Target" if score >= threshold else "Other"
-        labeled.append({
+    other_embs: List[np.ndarray] = []
+    other_idx: List[int] = []
+    for i, (s, e) in enumerate(intervals):
+        speaker = "Target" if scores[i] >= threshold else "Other"
+        if cluster_others and speaker == "Other" and embs[i] is not None:
+            other_embs.append(embs[i])
+            other_idx.append(len(labeled))
+        entry = {
             "speaker": speaker,
             "start": float(s),
             "end": float(e),
-            "score": float(score),
-        })
+            "score": float(scores[i]),
+            "scored_by": scored_by[i],
+        }
+        if i in full_scores:
+            entry["full_score"] = float(full_scores[i])
+        labeled.append(entry)
+
+    if cluster_others and other_embs:
+        with span("label:cluster", n=len(other_embs)):
+            clusters = cluster_embeddings(other_embs, threshold=cluster_threshold, max_speakers=max_speakers)
+        for i, c in zip(other_idx, clusters):
+            labeled[i]["speaker"] = f"Speaker_{c + 1}"
     return labeled
 
 
+def cascade_summary(labeled: List[Dict], threshold: float) -> Dict:
+    """Early-exit fraction of the scoring cascade and, over audited early
+    exits, how often the excerpt decision matched full-length scoring."""
+    early = [l for l in labeled if l.get("scored_by") == "excerpt"]
+    audited = [l for l in early if "full_score" in l]
+    agreed = sum((l["full_score"] >= threshold) == (l["score"] >= threshold) for l in audited)
+    return {
+        "segments": len(labeled),
+        "early_exit": len(early),
+        "early_exit_fraction": round(len(early) / len(labeled), 4) if labeled else None,
+        "audited": len(audited),
+        "agreement": round(agreed / len(audited), 4) if audited else None,
+    }
+
+
 def assemble_audio(wav: np.ndarray, sr: int, labeled: List[Dict], speaker_label: str = "Target") -> np.ndarray:
     chunks = []
     for item in labeled:
@@ -1,33 +1,18 @@
-from typing import Optional
+import threading
+from typing import List, Optional
 
 import numpy as np
 
-_SB_CLASSIFIER = None
+from app.utils.compat import patch_torchaudio_backends
+from app.utils.metrics import MODEL_CACHE_HITS, MODEL_LOADS
+from app.utils.threads import configure_torch
+from app.utils.tracing import span
 
-
-def _patch_torchaudio_backends() -> None:
-    """Work around torchaudio API differences across versions.
-    Some environments miss list_audio_backends/get_audio_backend.
-    We provide safe no-op fallbacks before loading SpeechBrain.
-    """
-    try:
-        import torchaudio  # type: ignore
-
-        if not hasattr(torchaudio, "list_audio_backends"):
-            def _list_audio_backends():
-                return []
-
-            torchaudio.list_audio_backends = _list_audio_backends  # type: ignore[attr-defined]
-
-        if not hasattr(torchaudio, "get_audio_backend"):
-            torchaudio.get_audio_backend = lambda: "soundfile"  # type: ignore[attr-defined]
-
-        if not hasattr(torchaudio, "set_audio_backend"):
-            torchaudio.set_audio_backend = lambda name: None  # type: ignore[attr-defined]
-    except Exception:
-        # If torchaudio import itself fails, SpeechBrain may still work
-        # for embedding inference; ignore and proceed.
-        pass
+# One encoder per device: a model loaded with run_opts={"device": "cpu"} cannot
+# serve tensors moved to cuda, and vice versa
+_SB_CLASSIFIERS = {}
+# Jobs and warm-up call _get_classifier concurrently; load each encoder once
+_LOAD_LOCK = threading.Lock()
 
 
 def _to_tensor(x: np.ndarray, device: str):
@@ -60,29 +45,62 @@ def _resolve_encoder_classifier():
     raise ImportError("speechbrain EncoderClassifier not found in known modules")
 
 
+def _get_classifier(device: str):
+    patch_torchaudio_backends()
+    configure_torch()
+    EncoderClassifier = _resolve_encoder_classifier()
+
+    with _LOAD_LOCK:
+        if device not in _SB_CLASSIFIERS:
+            with span("embed:load_model", device=device):
+                _SB_CLASSIFIERS[device] = EncoderClassifier.from_hparams(
+                    source="speechbrain/spkrec-ecapa-voxceleb", run_opts={"device": device}, savedir=None
+                )
+            MODEL_LOADS.inc(model="ecapa")
+        else:
+            MODEL_CACHE_HITS.inc(model="ecapa")
+        return _SB_CLASSIFIERS[device]
+
+
 def get_speaker_embedding(wav: np.ndarray, sr: int, device: str = "cpu") -> np.ndarray:
     """
     Compute a single-speaker embedding for the given mono waveform using SpeechBrain
     ECAPA-TDNN. Returns a L2-normalized vector as np.ndarray.
     """
-    _patch_torchaudio_backends()
-    EncoderClassifier = _resolve_encoder_classifier()
+    classifier = _get_classifier(device)
     import torch
     import numpy as np
 
-    global _SB_CLASSIFIER
-    if _SB_CLASSIFIER is None:
-        _SB_CLASSIFIER = EncoderClassifier.from_hparams(
-            source="speechbrain/spkrec-ecapa-voxceleb", run_opts={"device": device}, savedir=None
-        )
-
     wav_t = _to_tensor(wav, device)
-    with torch.no_grad():
-        emb = _SB_CLASSIFIER.encode_batch(wav_t)
+    with span("embed:model"), torch.no_grad():
+        emb = classifier.encode_batch(wav_t)
     emb_np = emb.squeeze(0).squeeze(0).cpu().numpy()
     norm = np.linalg.norm(emb_np) + 1e-9
     return emb_np / norm
 
 
+def get_speaker_embeddings(wavs: List[np.ndarray], sr: int, device: str = "cpu") -> List[np.ndarray]:
+    """
+    Batched variant of get_speaker_embedding. Waveforms are zero-padded to the
+    longest one and relative lengths are passed so pooling ignores the padding.
+    """
+    if not wavs:
+        return []
+    classifier = _get_classifier(device)
+    import torch
+
+    max_len = max(len(w) for w in wavs)
+    batch = np.zeros((len(wavs), max_len), dtype=np.float32)
+    lens = np.zeros(len(wavs), dtype=np.float32)
+    for i, w in enumerate(wavs):
+        batch[i, : len(w)] = w
+        lens[i] = len(w) / max_len
+    with span("embed:batch_model", size=len(wavs)), torch.no_grad():
+        emb = classifier.encode_batch(torch.from_numpy(batch).to(device), torch.from_numpy(lens).to(device))
+    emb_np = emb.squeeze(1).cpu().numpy()
+    emb_np /= np.linalg.norm(emb_np, axis=1, keepdims=True) + 1e-9
+    return list(emb_np)
+
+
 def cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b) / ((np.linalg.norm(a) + 1e-9) * (np.linalg.norm(b) + 1e-9)))
@@ -0,0 +1,71 @@
+from math import ceil
+from typing import List, Tuple
+
+import numpy as np
+
+
+Segment = Tuple[float, float]  # (start_sec, end_sec)
+
+
+def _frame_energy(seg: np.ndarray, frame_len: int, smooth: int) -> np.ndarray:
+    """Mean-square energy per frame, smoothed over `smooth` frames so a cut
+    lands in a pause rather than on a single quiet frame inside a word."""
+    n = len(seg) // frame_len
+    frames = seg[: n * frame_len].reshape(n, frame_len).astype(np.float32, copy=False)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame_len
+    if smooth > 1 and n >= smooth:
+        energy = np.convolve(energy, np.ones(smooth, dtype=np.float32) / smooth, mode="same")
+    return energy
+
+
+def split_long_intervals(
+    wav: np.ndarray,
+    sr: int,
+    intervals: List[Segment],
+    max_sec: float = 12.0,
+    target_sec: float = 8.0,
+    search_sec: float = 2.0,
+    min_sec: float = 1.0,
+    frame_ms: int = 20,
+    smooth_frames: int = 5,
+) -> List[Segment]:
+    """
+    Split VAD intervals longer than `max_sec` at low-energy points.
+
+    A long interval is cut into roughly equal pieces of about `target_sec`:
+    each cut goes to the quietest (smoothed) frame within `search_sec` of the
+    ideal position, never closer than `min_sec` to the previous cut and never
+    more than `max_sec` after it, so every piece is at most `max_sec` long.
+    Pieces are contiguous; intervals up to `max_sec` are returned unchanged.
+    `max_sec <= 0` disables splitting.
+    """
+    if max_sec <= 0:
+        return list(intervals)
+    target_sec = min(target_sec, max_sec)
+    min_sec = min(min_sec, target_sec / 2)
+    frame_len = max(1, int(sr * frame_ms / 1000))
+    frame_sec = frame_len / sr
+
+    out: List[Segment] = []
+    for s, e in intervals:
+        if e - s <= max_sec:
+            out.append((s, e))
+            continue
+        s_i = int(s * sr)
+        energy = _frame_energy(wav[s_i:int(e * sr)], frame_len, smooth_frames)
+        cursor = s
+        while e - cursor > max_sec:
+            ideal = cursor + (e - cursor) / ceil((e - cursor) / target_sec)
+            lo = max(cursor + min_sec, ideal - search_sec)
+            hi = min(cursor + max_sec, ideal + search_sec, e - min_sec)
+            # Frames are indexed from the interval start; only whole frames inside [lo, hi]
+            f_lo = int(ceil((lo - s) / frame_sec))
+            f_hi = min(int((hi - s) / frame_sec), len(energy))
+            if f_hi > f_lo:
+                cut = s + (f_lo + int(np.argmin(energy[f_lo:f_hi]))) * frame_sec
+            else:
+                cut = ideal
+            out.append((cursor, cut))
+            cursor = cut
+        out.append((cursor, e))
+    return out
@@ -1,7 +1,21 @@
-from typing import List, Tuple
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
 
 import numpy as np
 
+from app.utils.compat import patch_torchaudio_backends
+from app.utils.metrics import MODEL_CACHE_HITS, MODEL_LOADS
+from app.utils.threads import configure_torch
+from app.utils.tracing import span
+
+_SILERO = None
+# Silero keeps recurrent state inside the model, so concurrent jobs take turns
+_SILERO_LOCK = threading.Lock()
+# Concurrent first calls must not load the model twice
+_SILERO_LOAD_LOCK = threading.Lock()
+
 
 def _frame_generator(wav: np.ndarray, sr: int, frame_ms: int):
     frame_len = int(sr * frame_ms / 1000)
@@ -45,20 +59,53 @@ def _vad_webrtc(wav: np.ndarray, sr: int, frame_ms: int, aggressiveness: int) ->
     return _merge_intervals(intervals)
 
 
+def silero_checkout() -> Optional[Path]:
+    """The torch.hub checkout of silero-vad, if one is cached (found without importing torch)."""
+    torch_home = os.environ.get("TORCH_HOME") or Path(
+        os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+    ) / "torch"
+    for ref in ("master", "main"):
+        path = Path(torch_home) / "hub" / f"snakers4_silero-vad_{ref}"
+        if (path / "hubconf.py").is_file():
+            return path
+    return None
+
+
+def _get_silero():
+    """Load Silero VAD once per process and reuse it across calls."""
+    global _SILERO
+    with _SILERO_LOAD_LOCK:
+        if _SILERO is None:
+            import torch
+
+            configure_torch()
+            patch_torchaudio_backends()
+            checkout = silero_checkout()
+            if checkout is not None:
+                # Load the cached checkout directly; the GitHub form still queries the repo's branches first
+                _SILERO = torch.hub.load(str(checkout), "silero_vad", source="local", verbose=False)
+            else:
+                _SILERO = torch.hub.load(
+                    repo_or_dir='snakers4/silero-vad', 
+                    model='silero_vad', 
+                    force_reload=False,
+                    verbose=False  # Suppress download progress
+                )
+            MODEL_LOADS.inc(model="silero")
+        else:
+            MODEL_CACHE_HITS.inc(model="silero")
+        return _SILERO
+
+
 def _vad_silero(wav: np.ndarray, sr: int, frame_ms: int) -> List[Tuple[float, float]]:
     import torch
-    # Use cached model, don't force reload
-    model, utils = torch.hub.load(
-        repo_or_dir='snakers4/silero-vad', 
-        model='silero_vad', 
-        force_reload=False,
-        verbose=False  # Suppress download progress
-    )
+    model, utils = _get_silero()
     (get_speech_timestamps, _, _, _, _, _) = utils
     wav_t = torch.from_numpy(wav).float()
     if wav_t.ndim > 1:
         wav_t = wav_t.mean(dim=0)
-    timestamps = get_speech_timestamps(wav_t, model, sampling_rate=sr)
+    with _SILERO_LOCK:
+        timestamps = get_speech_timestamps(wav_t, model, sampling_rate=sr)
     intervals = []
     for t in timestamps:
         s = t['start'] / sr
@@ -98,9 +145,12 @@ def detect_speech_intervals(
     """
     try:
         import webrtcvad  # noqa: F401
-        return _vad_webrtc(wav, sr, frame_ms, aggressiveness)
+        with span("vad:webrtc"):
+            return _vad_webrtc(wav, sr, frame_ms, aggressiveness)
     except Exception:
         try:
-            return _vad_silero(wav, sr, frame_ms)
+            with span("vad:silero"):
+                return _vad_silero(wav, sr, frame_ms)
         except Exception:
-            return _vad_energy(wav, sr, frame_ms)
+            with span("vad:energy"):
+                return _vad_energy(wav, sr, frame_ms)
@@ -0,0 +1,90 @@
+"""
+Model warm-up shared by the API server and the Streamlit UI.
+
+`warm_up` loads each configured model once into the process-wide caches
+used by the pipeline and runs a short dummy inference so lazy kernel
+initialization happens before the first real request. Model specs:
+
+- "ecapa"          SpeechBrain speaker encoder
+- "vad"            whichever VAD backend detect_speech_intervals resolves to
+- "whisper:<size>" Whisper ASR model of the given size
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.logging import get_logger
+
+
+log = get_logger(__name__)
+
+_DONE = threading.Event()
+_STATUS: Dict[str, Dict] = {}
+_LOCK = threading.Lock()
+
+
+def parse_models(spec: Optional[str]) -> List[str]:
+    """Parse a comma-separated model list such as "ecapa,vad,whisper:tiny"; "none" is empty."""
+    if (spec or "").strip().lower() == "none":
+        return []
+    return [m.strip() for m in (spec or "").split(",") if m.strip()]
+
+
+def _dummy_audio(sr: int, seconds: float = 1.0) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (0.01 * rng.standard_normal(int(sr * seconds))).astype(np.float32)
+
+
+def _warm_one(model: str, device: str, sr: int) -> None:
+    if model == "ecapa":
+        from app.pipeline.embedding import get_speaker_embedding
+
+        get_speaker_embedding(_dummy_audio(sr), sr, device=device)
+    elif model == "vad":
+        from app.pipeline.vad import detect_speech_intervals
+
+        detect_speech_intervals(_dummy_audio(sr), sr)
+    elif model.startswith("whisper:"):
+        from app.pipeline.asr import _get_whisper_model
+
+        whisper_model = _get_whisper_model(model.split(":", 1)[1])
+        whisper_model.transcribe(_dummy_audio(16000), fp16=False)
+    else:
+        raise ValueError(f"Unknown warm-up model: {model}")
+
+
+def warm_up(models: Sequence[str], device: str = "cpu", sample_rate: int = 16000) -> Dict[str, Dict]:
+    """Load and exercise each model once. Failures are logged and reported,
+    not raised, so the server still starts; it just never reports ready
+    (see `is_ready`) until every model has warmed up. Models that already
+    warmed up on `device` are skipped, so calling this again retries only the failures."""
+    with _LOCK:
+        for model in models:
+            prev = _STATUS.get(model, {})
+            if prev.get("ok") and prev.get("device") == device:
+                continue
+            t0 = time.perf_counter()
+            try:
+                _warm_one(model, device, sample_rate)
+                _STATUS[model] = {"ok": True, "device": device, "seconds": round(time.perf_counter() - t0, 3)}
+                log.info(f"Warmed up {model} ({_STATUS[model]['seconds']:.1f}s)")
+            except Exception as e:
+                _STATUS[model] = {"ok": False, "device": device, "error": str(e)}
+                log.warning(f"Warm-up failed for {model}: {e}")
+        _DONE.set()
+        return dict(_STATUS)
+
+
+def is_ready() -> bool:
+    """True once warm-up has run and every model in it loaded."""
+    return _DONE.is_set() and not failed_models()
+
+
+def failed_models() -> List[str]:
+    return [model for model, status in _STATUS.items() if not status.get("ok")]
+
+
+def warmup_status() -> Dict[str, Dict]:
+    return dict(_STATUS)
@@ -0,0 +1,58 @@
+"""
+Transcript search CLI.
+
+    python -m app.search index outputs/jobs outputs/ui_cache
+    python -m app.search query "health podcast" --speaker Target
+    python -m app.search query "welc*" --json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from app.search.index import DEFAULT_INDEX, TranscriptIndex
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="python -m app.search", description="Index and search run transcripts")
+    p.add_argument("--index", type=Path, default=DEFAULT_INDEX, help="Index file (default: %(default)s)")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    ix = sub.add_parser("index", help="Ingest new or changed runs under the given directories")
+    ix.add_argument("roots", type=Path, nargs="*", default=[Path("outputs")], help="Directories to scan for runs")
+    ix.add_argument("--prune", action="store_true", help="Drop runs whose diarization.json was deleted")
+
+    q = sub.add_parser("query", help="Find segments containing all query words")
+    q.add_argument("text", help="Words to find; end a word with * for a prefix match")
+    q.add_argument("--speaker", default=None, help="Only segments of this speaker (e.g. Target)")
+    q.add_argument("--phrase", action="store_true", help="Words must appear consecutively")
+    q.add_argument("--limit", type=int, default=50, help="Maximum hits")
+    q.add_argument("--json", action="store_true", help="Print hits as JSON lines")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with TranscriptIndex(args.index) as index:
+        if args.command == "index":
+            stats = index.update(args.roots, prune=args.prune)
+            totals = index.counts()
+            print(
+                f"{stats.added} added, {stats.updated} updated, {stats.unchanged} unchanged, "
+                f"{stats.removed} removed, {stats.failed} failed ({stats.segments} segments ingested)"
+            )
+            print(f"Index {args.index}: {totals['runs']} runs, {totals['segments']} segments, {totals['terms']} terms")
+            return 1 if stats.failed else 0
+
+        hits = index.search(args.text, speaker=args.speaker, phrase=args.phrase, limit=args.limit)
+        for hit in hits:
+            if args.json:
+                print(json.dumps(hit.as_dict(), ensure_ascii=False))
+            else:
+                print(f"{hit.run_id}  {hit.start_ms:>9}-{hit.end_ms:<9} ms  [{hit.speaker}]  {hit.text}")
+        return 0 if hits else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+On-disk inverted index over the transcripts of many pipeline runs.
+
+A run is any directory holding a diarization.json. Each segment is stored
+once with its run, speaker and start/end in milliseconds, and every distinct
+word of its text gets a (term, segment) posting in a WITHOUT ROWID table, so
+a query is a few index range scans and never reopens run JSON files.
+
+Runs are keyed by resolved path and re-read only when their diarization.json
+changed (mtime and size), so indexing the same roots again only ingests new
+or updated runs; a run reached through overlapping roots is ingested once.
+A run's id is its path relative to the root it was found under (API jobs all
+write to ".../<job>/results", so the leaf name alone is ambiguous).
+Everything lives in a single SQLite file.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+DEFAULT_INDEX = Path(os.environ.get("VP_SEARCH_INDEX", "outputs/transcript_index.sqlite"))
+RUN_FILE = "diarization.json"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    run_id TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    speaker TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_run ON segments(run);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    segment INTEGER NOT NULL REFERENCES segments(id) ON DELETE CASCADE,
+    PRIMARY KEY (term, segment)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_segment ON postings(segment);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+@dataclass
+class SearchHit:
+    run_id: str
+    run_path: str
+    speaker: str
+    start_ms: int
+    end_ms: int
+    text: str
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class IndexStats:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    failed: int = 0
+    segments: int = 0
+
+
+def run_id_for(root: Path, run_dir: Path) -> str:
+    """`run_dir` relative to `root` (the root's own name if the root is the run)."""
+    rel = run_dir.relative_to(root)
+    return rel.as_posix() if rel.parts else (root.resolve().name or str(root))
+
+
+def _load_segments(path: Path) -> List[Dict]:
+    segments = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(segments, list) or not all(isinstance(seg, dict) for seg in segments):
+        raise ValueError(f"{path} is not a list of segment objects")
+    return segments
+
+
+def find_runs(roots: Iterable[Path]) -> Iterator[Path]:
+    """Run directories (those containing diarization.json) under `roots`."""
+    for root in roots:
+        if (root / RUN_FILE).is_file():
+            yield root
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            if Path(dirpath) != root and RUN_FILE in filenames:
+                yield Path(dirpath)
+
+
+class TranscriptIndex:
+    def __init__(self, path: Path = DEFAULT_INDEX):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "TranscriptIndex":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+    # -- ingestion -------------------------------------------------------
+
+    def update(self, roots: Sequence[Path], prune: bool = False) -> IndexStats:
+        """Ingest new or changed runs under `roots`. With `prune`, drop runs
+        whose diarization.json no longer exists."""
+        stats = IndexStats()
+        seen = set()
+        with self._lock:
+            known = {
+                row[0]: (row[1], row[2], row[3])
+                for row in self._conn.execute("SELECT path, id, mtime_ns, size FROM runs")
+            }
+            for root, run_dir in ((root, d) for root in roots for d in find_runs([root])):
+                key = str(run_dir.resolve())
+                if key in seen:
+                    continue  # Reached again through an overlapping root
+                seen.add(key)
+                try:
+                    st = (run_dir / RUN_FILE).stat()
+                    prev = known.get(key)
+                    if prev is not None and prev[1:] == (st.st_mtime_ns, st.st_size):
+                        stats.unchanged += 1
+                        continue
+                    segments = _load_segments(run_dir / RUN_FILE)
+                    with self._conn:
+                        if prev is not None:
+                            self._conn.execute("DELETE FROM runs WHERE id = ?", (prev[0],))
+                        stats.segments += self._add_run(
+                            key, run_id_for(root, run_dir), st.st_mtime_ns, st.st_size, segments
+                        )
+                except (OSError, ValueError, KeyError, TypeError):
+                    stats.failed += 1
+                    continue
+                if prev is None:
+                    stats.added += 1
+                else:
+                    stats.updated += 1
+            if prune:
+                gone = [(v[0],) for k, v in known.items() if k not in seen and not (Path(k) / RUN_FILE).exists()]
+                with self._conn:
+                    self._conn.executemany("DELETE FROM runs WHERE id = ?", gone)
+                stats.removed = len(gone)
+        return stats
+
+    def _add_run(self, path: str, run_id: str, mtime_ns: int, size: int, segments: List[Dict]) -> int:
+        cur = self._conn.execute(
+            "INSERT INTO runs (path, run_id, mtime_ns, size) VALUES (?, ?, ?, ?)", (path, run_id, mtime_ns, size)
+        )
+        run = cur.lastrowid
+        postings: List[Tuple[str, int]] = []
+        n = 0
+        for seg in segments:
+            text = (seg.get("text") or "").strip()
+            if not text:
+                continue
+            cur = self._conn.execute(
+                "INSERT INTO segments (run, speaker, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?)",
+                (run, str(seg["speaker"]), round(float(seg["start"]) * 1000), round(float(seg["end"]) * 1000), text),
+            )
+            postings.extend((term, cur.lastrowid) for term in set(tokenize(text)))
+            n += 1
+        self._conn.executemany("INSERT INTO postings (term, segment) VALUES (?, ?)", postings)
+        return n
+
+    # -- queries ---------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        speaker: Optional[str] = None,
+        phrase: bool = False,
+        limit: int = 50,
+    ) -> List[SearchHit]:
+        """Segments containing every word of `query` (a trailing * makes a
+        word a prefix match). With `phrase`, the words must also appear
+        consecutively in that order."""
+        words = [w for w in query.lower().split() if w]
+        clauses, params = [], []
+        for word in words:
+            prefix = word.endswith("*")
+            tokens = tokenize(word)
+            if not tokens:
+                continue
+            for i, tok in enumerate(tokens):
+                if prefix and i == len(tokens) - 1:
+                    clauses.append("SELECT segment FROM postings WHERE term >= ? AND term < ?")
+                    params.extend([tok, tok + "\U0010ffff"])
+                else:
+                    clauses.append("SELECT segment FROM postings WHERE term = ?")
+                    params.append(tok)
+        if not clauses:
+            return []
+        sql = (
+            "SELECT r.run_id, r.path, s.speaker, s.start_ms, s.end_ms, s.text "
+            "FROM segments s JOIN runs r ON r.id = s.run "
+            f"WHERE s.id IN ({' INTERSECT '.join(clauses)})"
+        )
+        if speaker:
+            sql += " AND s.speaker = ?"
+            params.append(speaker)
+        sql += " ORDER BY r.path, s.start_ms"
+        if not phrase:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        hits = [SearchHit(*row) for row in rows]
+        if phrase:
+            needle = tokenize(query)
+            hits = [h for h in hits if _contains_sequence(tokenize(h.text), needle, query.rstrip().endswith("*"))]
+            hits = hits[:limit]
+        return hits
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "runs": self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0],
+                "segments": self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0],
+                "terms": self._conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0],
+            }
+
+
+def _contains_sequence(tokens: List[str], needle: List[str], last_is_prefix: bool = False) -> bool:
+    n = len(needle)
+    for i in range(len(tokens) - n + 1):
+        window = tokens[i:i + n]
+        if window[:-1] == needle[:-1] and (
+            window[-1].startswith(needle[-1]) if last_is_prefix else window[-1] == needle[-1]
+        ):
+            return True
+    return False
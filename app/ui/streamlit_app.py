@@ -1,51 +1,175 @@
-import io
+import hashlib
 import json
+import os
+import shutil
+import threading
+import uuid
+from dataclasses import asdict
 from pathlib import Path
 
 import streamlit as st
 
+from app.audio.envelope import ENVELOPE_DIR, load_envelope, speaker_spans
 from app.pipeline.config import PipelineConfig
 from app.main import run_pipeline
+from app.pipeline.warmup import warm_up
+from app.utils.threads import apply_thread_budget, plan_threads
+from app.utils.uploads import keep_in_memory, stream_to_file
 
 
 st.set_page_config(page_title="Voice Processor", page_icon="🎙️", layout="centered")
 st.title("🎙️ Voice Processor")
 st.caption("AI-powered speaker diarization and voice-to-text transcription")
 
+CACHE_ROOT = Path("outputs/ui_cache")
+SESSIONS_ROOT = Path("outputs/ui_sessions")
+MAX_CACHED_RESULTS = 20
+# Config fields that don't change the transcript, so they stay out of the cache key
+_NON_RESULT_FIELDS = {
+    "device", "inference_batching", "batch_max_size", "batch_max_wait_ms", "trace", "profile_stages",
+    "memory_accounting", "tracemalloc_top", "warmup_models", "cpu_threads", "concurrent_jobs",
+}
+TIMELINE_MAX_BINS = 1500
+STAGE_LABELS = {
+    "load": "Loading audio...",
+    "embed": "Embedding target speaker...",
+    "vad": "Detecting speech...",
+    "segment": "Splitting long speech intervals...",
+    "label": "Matching segments to the target speaker...",
+    "assemble": "Assembling target audio...",
+    "asr": "Transcribing...",
+}
+
+
+@st.cache_resource
+def configure_threads():
+    """Split the cores once per server process between the runs allowed at
+    once (VP_MAX_CONCURRENT_JOBS, as for the API); see run_slots."""
+    return apply_thread_budget(plan_threads(PipelineConfig(
+        cpu_threads=int(os.environ.get("VP_CPU_THREADS", "0")),
+        concurrent_jobs=int(os.environ.get("VP_MAX_CONCURRENT_JOBS", "1")),
+    )))
+
+
+@st.cache_resource
+def run_slots(concurrent_jobs: int) -> threading.BoundedSemaphore:
+    """Shared by all sessions: at most `concurrent_jobs` pipelines run at once,
+    so the thread budget planned for that many holds however many sessions click Run."""
+    return threading.BoundedSemaphore(concurrent_jobs)
+
 
 @st.cache_resource(show_spinner="Preloading models...")
-def preload_models():
-    """Preload models to speed up first run"""
-    import torch
-    # Preload Whisper
-    import whisper
-    whisper.load_model("tiny")
-    # Preload Silero VAD
-    torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad', force_reload=False)
-    return True
-
-
-def save_uploaded_file(uploaded, path: Path) -> Path:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    data = uploaded.read()
-    path.write_bytes(data)
+def preload_models(models: tuple, device: str):
+    """Load and warm the selected models once; the pipeline reuses the same instances."""
+    return warm_up(list(models), device=device)
+
+
+def save_uploaded_file(uploaded, path: Path):
+    """Small uploads are decoded straight from Streamlit's buffer; larger ones
+    are copied to disk in chunks instead of duplicating them in memory."""
+    uploaded.seek(0)
+    if keep_in_memory(uploaded.size):
+        return uploaded
+    path = path.with_suffix(Path(uploaded.name).suffix.lower() or ".wav")
+    stream_to_file(uploaded, path)
     return path
 
 
+def session_dir() -> Path:
+    """Per-browser-session scratch directory, so sessions never share files."""
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return SESSIONS_ROOT / st.session_state["session_id"]
+
+
+def result_key(mixture, target, cfg: PipelineConfig) -> str:
+    """Content hash of both uploads plus the settings that change the output."""
+    h = hashlib.sha256()
+    for uploaded in (mixture, target):
+        h.update(uploaded.getbuffer())
+        h.update(b"\0")
+    settings = {k: v for k, v in asdict(cfg).items() if k not in _NON_RESULT_FIELDS}
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def prune_cache(keep: int = MAX_CACHED_RESULTS) -> None:
+    if not CACHE_ROOT.exists():
+        return
+    entries = sorted((d for d in CACHE_ROOT.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime, reverse=True)
+    for d in entries[keep:]:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_RESULTS)
+def load_results(result_dir: str):
+    """Parse a finished result directory once; cache dirs are immutable per content hash."""
+    d = Path(result_dir)
+    diar_bytes = (d / "diarization.json").read_bytes()
+    try:
+        data = json.loads(diar_bytes.decode("utf-8"))
+    except Exception:
+        data = []
+    wav = d / "target_speaker.wav"
+    return data, diar_bytes, (wav.read_bytes() if wav.exists() else None)
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_CACHED_RESULTS)
+def cached_envelope(result_dir: str):
+    return load_envelope(Path(result_dir))
+
+
+def render_timeline(result_dir: str, segments: list) -> None:
+    """Zoomable min/max waveform with speaker overlays. Only the envelope level
+    matching the zoom is read and the overlay is binned to the same budget, so
+    cost is flat in recording length and segment count."""
+    import altair as alt
+    import pandas as pd
+
+    env = cached_envelope(result_dir)
+    if env.duration <= 0:
+        return
+    t0, t1 = st.slider(
+        "Zoom (seconds)", min_value=0.0, max_value=float(env.duration),
+        value=(0.0, float(env.duration)), step=max(env.duration / 2000, 0.01), format="%.1f",
+    )
+    if t1 <= t0:
+        t1 = min(env.duration, t0 + 0.1)
+    times, mins, maxs = env.window(t0, t1, max_bins=TIMELINE_MAX_BINS)
+    wave = pd.DataFrame({"t": times, "min": mins, "max": maxs})
+    band = alt.Chart(wave).mark_area(opacity=0.6, color="#4C78A8").encode(
+        x=alt.X("t:Q", title="Time (s)", scale=alt.Scale(domain=[t0, t1])),
+        y=alt.Y("min:Q", title=None, scale=alt.Scale(domain=[-1, 1])),
+        y2="max:Q",
+    )
+    spans = speaker_spans(segments, t0, t1, max_bins=TIMELINE_MAX_BINS)
+    layers = [band]
+    if spans:
+        overlay = pd.DataFrame(spans, columns=["start", "end", "speaker"])
+        layers.insert(0, alt.Chart(overlay).mark_rect(opacity=0.25).encode(
+            x="start:Q", x2="end:Q", color=alt.Color("speaker:N", title="Speaker"),
+            tooltip=["speaker:N", "start:Q", "end:Q"],
+        ))
+    st.altair_chart(alt.layer(*layers).properties(height=220), use_container_width=True)
+    st.caption(f"{len(times)} bins of {(times[1] - times[0]) if len(times) > 1 else 0:.3f}s")
+
+
 with st.sidebar:
     st.header("Settings")
     asr_backend = st.selectbox("ASR backend", ["whisper"], index=0)
     asr_model = st.selectbox("Whisper model", ["tiny", "base", "small"], index=0)
     threshold = st.slider("Target similarity threshold", min_value=0.0, max_value=1.0, value=0.6, step=0.05)
     transcribe_only_target = st.checkbox("Transcribe only Target speaker (faster)", value=True)
+    cluster_speakers = st.checkbox("Separate other speakers (Speaker_1..N)", value=False)
     device = st.selectbox("Device", ["cpu", "cuda"], index=0)
-    out_dir = Path("outputs/ui_run")
-    st.text(f"Output dir: {out_dir}")
+    st.text(f"Session dir: {session_dir()}")
+    threads = configure_threads()
+    st.text(f"CPU threads: {threads.threads_per_worker} per run ({threads.cores} cores)")
     
     st.info("⏱️ **Performance Tip**: Transcription processes ~1 segment/second on CPU. Segments < 0.5s are skipped automatically.", icon="ℹ️")
 
-# Preload models on first access
-preload_models()
+# Preload models on first access (and whenever the selected Whisper size changes)
+preload_models(("ecapa", "vad", f"whisper:{asr_model}"), device)
 
 st.markdown("### 📤 Upload Audio Files")
 mixture = st.file_uploader("Multi-speaker audio (WAV/MP3)", type=["wav", "mp3"], accept_multiple_files=False, help="Upload the audio file with multiple speakers")
@@ -54,39 +178,79 @@ target = st.file_uploader("Target speaker sample (3-10 seconds)", type=["wav", "
 run_clicked = st.button("Run Pipeline", type="primary", disabled=not (mixture and target))
 
 if run_clicked and mixture and target:
-    status = st.status("Running pipeline...", expanded=True)
-    tmp = out_dir / "_tmp"
-    mix_path = save_uploaded_file(mixture, tmp / "mixture.wav")
-    tgt_path = save_uploaded_file(target, tmp / "target.wav")
-
     cfg = PipelineConfig(
         asr_backend=asr_backend,
         asr_model=asr_model,
         device=device,
         target_threshold=threshold,
         transcribe_only_target=transcribe_only_target,
+        cluster_other_speakers=cluster_speakers,
+        cpu_threads=threads.cores,
+        concurrent_jobs=threads.concurrent_jobs,
     )
-    try:
-        status.update(label="Loading audio...", state="running")
-        run_pipeline(mix_path, tgt_path, out_dir, cfg)
-        status.update(label="✅ Pipeline complete!", state="complete")
-        st.success("Done! Scroll down to see results.")
-    except Exception as e:
-        status.update(label="❌ Pipeline failed", state="error")
-        st.error(f"Pipeline failed: {e}")
-
-if out_dir.exists():
-    diar_json = out_dir / "diarization.json"
-    if diar_json.exists():
+    result_dir = CACHE_ROOT / result_key(mixture, target, cfg)
+
+    if (result_dir / "diarization.json").exists():
+        os.utime(result_dir)
+        st.session_state["result_dir"] = str(result_dir)
+        st.success("⚡ Same files and settings as an earlier run — showing cached results.")
+    else:
+        status = st.status("Running pipeline...", expanded=True)
+        counts_box = status.empty()
+        live_box = status.container(height=250)
+        seen = {"segments": 0, "transcribed": 0, "target": 0}
+
+        def on_progress(stage: str) -> None:
+            status.update(label=STAGE_LABELS.get(stage, stage), state="running")
+
+        def on_segment(entry: dict) -> None:
+            seen["segments"] += 1
+            seen["target"] += entry.get("speaker") == "Target"
+            if entry.get("text", "").strip():
+                seen["transcribed"] += 1
+                live_box.markdown(f"**[{entry['start']:.1f}s - {entry['end']:.1f}s]** *{entry['speaker']}* {entry['text']}")
+            counts_box.markdown(
+                f"Segments: **{seen['segments']}** · Transcribed: **{seen['transcribed']}** · Target: **{seen['target']}**"
+            )
+
+        work = session_dir()
+        run_dir = work / "run"
+        shutil.rmtree(run_dir, ignore_errors=True)
         try:
-            data = json.loads(diar_json.read_text(encoding="utf-8"))
-        except Exception:
-            data = []
-        
+            mix_src = save_uploaded_file(mixture, work / "_tmp" / "mixture.wav")
+            tgt_src = save_uploaded_file(target, work / "_tmp" / "target.wav")
+            slots = run_slots(threads.concurrent_jobs)
+            if not slots.acquire(blocking=False):
+                status.update(label="Waiting for another session's run to finish...", state="running")
+                slots.acquire()
+            try:
+                run_pipeline(mix_src, tgt_src, run_dir, cfg, progress=on_progress, on_segment=on_segment)
+            finally:
+                slots.release()
+            result_dir.parent.mkdir(parents=True, exist_ok=True)
+            if result_dir.exists():
+                shutil.rmtree(run_dir, ignore_errors=True)
+            else:
+                run_dir.rename(result_dir)
+            prune_cache()
+            st.session_state["result_dir"] = str(result_dir)
+            status.update(label="✅ Pipeline complete!", state="complete")
+            st.success("Done! Scroll down to see results.")
+        except Exception as e:
+            status.update(label="❌ Pipeline failed", state="error")
+            st.error(f"Pipeline failed: {e}")
+        finally:
+            shutil.rmtree(work / "_tmp", ignore_errors=True)
+
+result_dir = st.session_state.get("result_dir")
+if result_dir:
+    if (Path(result_dir) / "diarization.json").exists():
+        data, diar_bytes, tgt_wav_bytes = load_results(result_dir)
+
         # Filter segments with transcribed text
         transcribed = [s for s in data if s.get('text', '').strip()]
         target_segments = [s for s in transcribed if s.get('speaker') == 'Target']
-        other_segments = [s for s in transcribed if s.get('speaker') == 'Other']
+        other_segments = [s for s in transcribed if s.get('speaker') != 'Target']
         
         # Analysis Section
         st.header("📊 Analysis")
@@ -100,6 +264,11 @@ if out_dir.exists():
         with col4:
             st.metric("Other Speakers", len(other_segments))
         
+        # Timeline Section
+        if (Path(result_dir) / ENVELOPE_DIR / "meta.json").exists():
+            st.header("🌊 Timeline")
+            render_timeline(result_dir, data)
+
         # Transcript Section
         if transcribed:
             st.header("📝 Transcript")
@@ -119,7 +288,9 @@ if out_dir.exists():
                 with st.expander("👥 Other Speakers Transcript"):
                     for seg in other_segments:
                         time_str = f"[{seg['start']:.1f}s - {seg['end']:.1f}s]"
-                        st.markdown(f"**{time_str}** {seg['text']}")
+                        speaker = seg.get('speaker', 'Other')
+                        prefix = f"*{speaker}* " if speaker != 'Other' else ""
+                        st.markdown(f"**{time_str}** {prefix}{seg['text']}")
         else:
             st.warning("No transcribed text found. The segments may be too short or contain no speech.")
         
@@ -130,16 +301,15 @@ if out_dir.exists():
         with col1:
             st.download_button(
                 "📄 Download Transcript (JSON)", 
-                diar_json.read_bytes(), 
+                diar_bytes, 
                 file_name="diarization.json",
                 mime="application/json"
             )
         with col2:
-            tgt_audio = out_dir / "target_speaker.wav"
-            if tgt_audio.exists():
+            if tgt_wav_bytes is not None:
                 st.download_button(
                     "🔊 Download Target Audio (WAV)", 
-                    tgt_audio.read_bytes(), 
+                    tgt_wav_bytes, 
                     file_name="target_speaker.wav",
                     mime="audio/wav"
                 )
@@ -0,0 +1,51 @@
+"""
+torchaudio compatibility shim.
+
+Some torchaudio builds lack list_audio_backends/get_audio_backend/
+set_audio_backend, which SpeechBrain (and the Silero VAD hub code) call.
+`patch_torchaudio_backends` adds no-op fallbacks. It imports torchaudio, and
+with it torch, so it is called right before a model that needs it is
+loaded rather than when the `app` package is imported.
+"""
+import threading
+
+
+_PATCHED = False
+_LOCK = threading.Lock()
+
+
+def patch_torchaudio_backends() -> None:
+    global _PATCHED
+    if _PATCHED:
+        return
+    with _LOCK:
+        if _PATCHED:
+            return
+        _PATCHED = True
+        try:
+            import types
+            import torchaudio  # type: ignore
+
+            if not hasattr(torchaudio, "list_audio_backends"):
+                def _list_audio_backends():
+                    return []
+                torchaudio.list_audio_backends = _list_audio_backends  # type: ignore[attr-defined]
+
+            if not hasattr(torchaudio, "get_audio_backend"):
+                torchaudio.get_audio_backend = lambda: "soundfile"  # type: ignore[attr-defined]
+
+            if not hasattr(torchaudio, "set_audio_backend"):
+                torchaudio.set_audio_backend = lambda name: None  # type: ignore[attr-defined]
+
+            backend = getattr(torchaudio, "backend", None)
+            if isinstance(backend, types.ModuleType):
+                if not hasattr(backend, "list_audio_backends"):
+                    backend.list_audio_backends = torchaudio.list_audio_backends  # type: ignore[attr-defined]
+                if not hasattr(backend, "get_audio_backend"):
+                    backend.get_audio_backend = torchaudio.get_audio_backend  # type: ignore[attr-defined]
+                if not hasattr(backend, "set_audio_backend"):
+                    backend.set_audio_backend = torchaudio.set_audio_backend  # type: ignore[attr-defined]
+        except Exception:
+            # If torchaudio import itself fails, SpeechBrain may still work
+            # for embedding inference; ignore and proceed.
+            pass
@@ -0,0 +1,102 @@
+"""
+Per-stage memory accounting.
+
+`StageMemory` records process RSS before and after a block and samples RSS
+from a background thread to catch the peak in between. With `top_n > 0` it
+also uses tracemalloc to report the Python-heap peak (numpy buffers
+included) and the largest allocation sites for the block.
+
+RSS is process-wide: with several concurrent jobs the numbers include the
+other jobs' memory, so size containers from single-job runs.
+"""
+import os
+import threading
+import tracemalloc
+from typing import Dict, List, Optional
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+MB = 1024 * 1024
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None if unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except Exception:
+        pass
+    try:
+        import psutil  # type: ignore
+
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        return None
+
+
+class StageMemory:
+    def __init__(self, interval: float = 0.005, top_n: int = 0):
+        self.interval = interval
+        self.top_n = top_n
+        self.before: Optional[int] = None
+        self.after: Optional[int] = None
+        self.peak: Optional[int] = None
+        self.py_peak: Optional[int] = None
+        self.top: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot = None
+        self._started_tracing = False
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self) -> "StageMemory":
+        self.before = current_rss()
+        self.peak = self.before
+        if self.top_n > 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        if self.before is not None:
+            self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.after = current_rss()
+        if self.after is not None and (self.peak is None or self.after > self.peak):
+            self.peak = self.after
+        if self._snapshot is not None:
+            try:
+                self.py_peak = tracemalloc.get_traced_memory()[1]
+                stats = tracemalloc.take_snapshot().compare_to(self._snapshot, "lineno")
+                self.top = [
+                    {"where": str(s.traceback), "size_mb": round(s.size_diff / MB, 3), "count": s.count_diff}
+                    for s in stats[: self.top_n]
+                ]
+            except RuntimeError:
+                # Another concurrent stage stopped tracemalloc underneath us
+                pass
+            self._snapshot = None
+            if self._started_tracing:
+                tracemalloc.stop()
+        return False
+
+    def as_dict(self) -> Dict:
+        def mb(v: Optional[int]) -> Optional[float]:
+            return round(v / MB, 2) if v is not None else None
+
+        out = {"rss_before_mb": mb(self.before), "rss_after_mb": mb(self.after), "rss_peak_mb": mb(self.peak)}
+        if self.py_peak is not None:
+            out["py_peak_mb"] = mb(self.py_peak)
+            out["top_allocations"] = self.top
+        return out
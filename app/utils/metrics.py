@@ -0,0 +1,218 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms keep their state in plain dicts keyed by
+label values; recording is a dict lookup plus a bisect under a lock, so it
+is cheap enough for per-segment loops. `render()` produces the text format
+served by the API's /metrics endpoint.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+BYTE_BUCKETS = tuple(float(1 << n) for n in range(20, 36))  # 1 MiB .. 32 GiB
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Compute the (unlabeled) value lazily at scrape time."""
+        self._fn = fn
+
+    def value(self, **labels: str) -> float:
+        if self._fn is not None:
+            return float(self._fn())
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            return [f"{self.name} {_fmt_value(self._fn())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._values.items()]
+        lines = []
+        for key, counts, total, n in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = f'le="{_fmt_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.setdefault(metric.name, metric)
+            return self._metrics[metric.name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "vp_stage_seconds", "Wall time per pipeline stage", labels=("stage",)
+))
+SEGMENT_SECONDS = REGISTRY.register(Histogram(
+    "vp_segment_seconds", "Per-segment inference latency", labels=("stage",)
+))
+CASCADE_SEGMENTS = REGISTRY.register(Counter(
+    "vp_label_cascade_segments_total", "Segments labeled by excerpt (early exit) or full-length embedding", labels=("scored_by",)
+))
+CASCADE_AUDITS = REGISTRY.register(Counter(
+    "vp_label_cascade_audits_total", "Early exits re-scored in full, by whether the label agreed", labels=("agreed",)
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "vp_inference_batch_size", "Items per micro-batch", labels=("batcher",), buckets=(1, 2, 4, 8, 16, 32, 64)
+))
+REAL_TIME_FACTOR = REGISTRY.register(Histogram(
+    "vp_real_time_factor", "Pipeline wall time divided by mixture duration", buckets=RATIO_BUCKETS
+))
+AUDIO_SECONDS = REGISTRY.register(Counter(
+    "vp_audio_seconds_total", "Seconds of mixture audio processed"
+))
+RUNS = REGISTRY.register(Counter(
+    "vp_runs_total", "Pipeline runs by outcome", labels=("status",)
+))
+MODEL_LOADS = REGISTRY.register(Counter(
+    "vp_model_loads_total", "Model instances loaded from disk or hub", labels=("model",)
+))
+MODEL_CACHE_HITS = REGISTRY.register(Counter(
+    "vp_model_cache_hits_total", "Model lookups served by the in-process cache", labels=("model",)
+))
+STAGE_RSS_PEAK = REGISTRY.register(Histogram(
+    "vp_stage_rss_peak_bytes", "Peak process RSS observed during a stage", labels=("stage",), buckets=BYTE_BUCKETS
+))
+STAGE_RSS_DELTA = REGISTRY.register(Histogram(
+    "vp_stage_rss_growth_bytes", "Peak RSS during a stage minus RSS at its start", labels=("stage",), buckets=BYTE_BUCKETS
+))
+PROCESS_RSS = REGISTRY.register(Gauge(
+    "vp_process_rss_bytes", "Current resident set size of the process"
+))
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "vp_job_queue_depth", "Jobs waiting for a worker"
+))
+JOBS_RUNNING = REGISTRY.register(Gauge(
+    "vp_jobs_running", "Jobs currently executing"
+))
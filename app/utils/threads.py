@@ -0,0 +1,160 @@
+"""
+CPU thread budget shared by torch, OpenMP/BLAS and the job pool.
+
+torch and the BLAS libraries size their thread pools to every core by
+default, and each Python thread that calls into them gets its own team. With
+several jobs (or batcher workers) running inference at once that
+oversubscribes the host, so the available cores are split between the
+threads that can run inference concurrently:
+
+    cores = cpu_threads or the cores this process may use (affinity/cgroup)
+    inference workers = concurrent jobs, or at most one per batcher when
+                        inference_batching routes all calls through batchers
+    threads per worker = cores // inference workers
+
+`apply_thread_budget` exports the OMP/MKL/OpenBLAS variables (inherited by
+child processes and read by torch when it initializes) and, when
+threadpoolctl is installed, resizes BLAS pools that were already loaded.
+It never imports torch itself: torch's intra-op threads are set by
+`configure_torch`, which the model loaders call right after importing it,
+or immediately if torch is already loaded. Entry points (CLI, API, UI,
+benchmarks) apply the budget once at start-up; `run_pipeline` applies the
+config's budget only if nothing has been applied in this process yet.
+"""
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from app.pipeline.config import PipelineConfig
+from app.utils.logging import get_logger
+
+
+log = get_logger(__name__)
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+# Embedding and ASR batchers each own one worker thread (see app.pipeline.batching)
+BATCHED_INFERENCE_WORKERS = 2
+
+_APPLIED: Optional["ThreadBudget"] = None
+# Budget torch was last configured with (None until torch is first configured)
+_TORCH_BUDGET: Optional["ThreadBudget"] = None
+_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    cores: int
+    concurrent_jobs: int
+    inference_workers: int
+    threads_per_worker: int
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def available_cores() -> int:
+    """Cores this process may run on, honouring CPU affinity and a cgroup v2 quota."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r", encoding="utf-8") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+def plan_threads(cfg: PipelineConfig) -> ThreadBudget:
+    cores = cfg.cpu_threads if cfg.cpu_threads > 0 else available_cores()
+    jobs = max(1, cfg.concurrent_jobs)
+    workers = min(jobs, BATCHED_INFERENCE_WORKERS) if cfg.inference_batching else jobs
+    workers = max(1, min(workers, cores))
+    return ThreadBudget(
+        cores=cores,
+        concurrent_jobs=jobs,
+        inference_workers=workers,
+        threads_per_worker=max(1, cores // workers),
+    )
+
+
+def apply_thread_budget(budget: ThreadBudget) -> ThreadBudget:
+    """Apply `budget` to this process (and, through the environment, its children)."""
+    global _APPLIED
+    with _LOCK:
+        if _APPLIED == budget:
+            return budget
+        n = str(budget.threads_per_worker)
+        for var in THREAD_ENV_VARS:
+            os.environ[var] = n
+        if "numpy" in sys.modules:
+            try:
+                from threadpoolctl import threadpool_limits  # type: ignore
+
+                threadpool_limits(limits=budget.threads_per_worker)
+            except ImportError:
+                pass
+        _APPLIED = budget
+        if "torch" in sys.modules:
+            _configure_torch_locked()
+    log.info(
+        f"CPU threads: {budget.cores} cores, {budget.concurrent_jobs} concurrent job(s), "
+        f"{budget.inference_workers} inference worker(s) x {budget.threads_per_worker} thread(s)"
+    )
+    return budget
+
+
+def configure_torch() -> None:
+    """Apply the current budget to torch. Called by the model loaders after
+    they import torch, so start-up never pays for the import; cheap once done."""
+    if _APPLIED is None or _TORCH_BUDGET == _APPLIED:
+        return
+    with _LOCK:
+        _configure_torch_locked()
+
+
+def _configure_torch_locked() -> None:
+    global _TORCH_BUDGET
+    if _APPLIED is None or _TORCH_BUDGET == _APPLIED:
+        return
+    try:
+        import torch  # type: ignore
+    except ImportError:
+        return
+    torch.set_num_threads(_APPLIED.threads_per_worker)
+    if _TORCH_BUDGET is None:
+        try:
+            # No inter-op parallelism is used; only settable before torch starts work
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    _TORCH_BUDGET = _APPLIED
+
+
+def ensure_thread_budget(cfg: PipelineConfig) -> ThreadBudget:
+    """Budget already applied in this process, or apply the one planned from `cfg`."""
+    if _APPLIED is not None:
+        return _APPLIED
+    return apply_thread_budget(plan_threads(cfg))
+
+
+def effective_threads() -> Dict[str, object]:
+    """What is actually in effect, for start-up reports and run summaries."""
+    out: Dict[str, object] = {"budget": _APPLIED.as_dict() if _APPLIED else None}
+    out["env"] = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        out["torch_threads"] = torch.get_num_threads()
+        out["torch_interop_threads"] = torch.get_num_interop_threads()
+    return out
@@ -0,0 +1,157 @@
+"""
+Lightweight span tracing with Chrome-trace / Perfetto JSON export.
+
+A Tracer is activated per pipeline run through a ContextVar, so concurrent
+jobs in one process keep separate traces. `span()` checks that variable and
+returns a shared no-op context manager when no tracer is active, so
+instrumented code costs one lookup when tracing is off.
+
+Open the exported trace.json in chrome://tracing or https://ui.perfetto.dev.
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+_CURRENT: ContextVar[Optional["Tracer"]] = ContextVar("vp_tracer", default=None)
+
+
+class Tracer:
+    def __init__(self, profile_stages: Iterable[str] = (), profile_dir: Optional[Path] = None):
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self._events: List[Dict] = []
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def record(self, name: str, start_ns: int, end_ns: int, args: Optional[Dict] = None) -> None:
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start_ns - self._t0) / 1000.0,
+            "dur": (end_ns - start_ns) / 1000.0,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+
+    def export(self, path: Path) -> Path:
+        with self._lock:
+            events = list(self._events)
+        names = {e["tid"] for e in events}
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": _thread_name(tid)}}
+            for tid in names
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": meta + events, "displayTimeUnit": "ms"}), encoding="utf-8")
+        return path
+
+
+class _TracerGroup:
+    """Records every event on several tracers, so work shared by several
+    traced jobs (one inference micro-batch) shows up in each job's trace."""
+
+    profile_stages: frozenset = frozenset()
+    profile_dir: Optional[Path] = None
+
+    def __init__(self, tracers: List[Tracer]):
+        self.tracers = tracers
+
+    def record(self, name: str, start_ns: int, end_ns: int, args: Optional[Dict] = None) -> None:
+        for tracer in self.tracers:
+            tracer.record(name, start_ns, end_ns, args)
+
+
+def shared_tracer(tracers: Iterable[Optional[Tracer]]):
+    """A tracer recording on each distinct tracer in `tracers` (None if there are none)."""
+    distinct = list({id(t): t for t in tracers if t is not None}.values())
+    if not distinct:
+        return None
+    if len(distinct) == 1:
+        return distinct[0]
+    return _TracerGroup(distinct)
+
+
+def _thread_name(tid: int) -> str:
+    for t in threading.enumerate():
+        if t.ident == tid:
+            return t.name
+    return str(tid)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+def span(name: str, **args):
+    """Context manager recording `name` as a complete event on the active tracer."""
+    tracer = _CURRENT.get()
+    if tracer is None:
+        return _NOOP
+    return _Span(tracer, name, args)
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def activate(tracer: Optional[Tracer]) -> Iterator[Optional[Tracer]]:
+    token = _CURRENT.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def maybe_profile(stage: str) -> Iterator[None]:
+    """Run the block under cProfile when the active tracer selected `stage`;
+    stats are dumped to <profile_dir>/profile_<stage>.prof."""
+    tracer = _CURRENT.get()
+    if tracer is None or tracer.profile_dir is None or stage not in tracer.profile_stages:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        tracer.profile_dir.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(str(tracer.profile_dir / f"profile_{stage}.prof"))
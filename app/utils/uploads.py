@@ -0,0 +1,87 @@
+"""
+Chunked upload handling shared by the API and the Streamlit UI.
+
+Uploads are copied to disk in fixed-size chunks (never read whole), with a
+hard size limit. Small uploads can instead be kept as an in-memory buffer
+and handed straight to `load_mono_audio`, skipping the temp file.
+"""
+import io
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = int(os.environ.get("VP_MAX_UPLOAD_BYTES", str(1 << 30)))
+# Uploads up to this size are decoded from memory; 0 disables in-memory decoding
+INMEMORY_MAX_BYTES = int(os.environ.get("VP_INMEMORY_UPLOAD_BYTES", "0"))
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+def stream_to_file(src: BinaryIO, path: Path, max_bytes: int = MAX_UPLOAD_BYTES, chunk_size: int = CHUNK_SIZE) -> int:
+    """Copy a binary stream to `path` chunk by chunk. Returns bytes written.
+    The partial file is removed if the limit is exceeded."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                f.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return written
+
+
+class UploadSink:
+    """Incremental destination for an upload whose size is not known up front.
+
+    Bytes are buffered in memory while the total stays within `inmemory_max`
+    and spill to `path` once it is exceeded, so each byte is written at most
+    once. Exceeding `max_bytes` raises UploadTooLargeError immediately.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = MAX_UPLOAD_BYTES, inmemory_max: int = INMEMORY_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.inmemory_max = inmemory_max
+        self.size = 0
+        self._buf = io.BytesIO()
+        self._file: Optional[BinaryIO] = None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+        if self._file is None and self.size > self.inmemory_max:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "wb")
+            self._file.write(self._buf.getbuffer())
+            self._buf = io.BytesIO()
+        (self._file or self._buf).write(data)
+
+    def finish(self) -> Union[Path, io.BytesIO]:
+        """The received upload: the file path, or a rewound in-memory buffer."""
+        if self._file is not None:
+            self._file.close()
+            return self.path
+        self._buf.seek(0)
+        self._buf.name = self.path.name
+        return self._buf
+
+    def discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+def keep_in_memory(size: Union[int, None], inmemory_max: int = INMEMORY_MAX_BYTES) -> bool:
+    return size is not None and 0 < size <= inmemory_max
@@ -0,0 +1 @@
+"""Offline performance benchmarks for the pipeline (run with `python -m benchmarks.run`)."""
@@ -0,0 +1,244 @@
+"""
+Stage-level pipeline benchmark.
+
+Generates a synthetic mixture, then times load_mono_audio, every available
+VAD backend, labeling, assembly and transcribe_segments separately. Models
+are replaced by deterministic stubs unless --real-models is given and the
+real weights are already cached locally.
+
+    python -m benchmarks.run --seconds 120 --speakers 3 --out bench.json
+    python -m benchmarks.run --compare bench.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.stubs import stub_embedding, stub_models
+from benchmarks.synthetic import make_mixture
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "repeat": repeat,
+    }
+
+
+def real_models_cached(model_size: str) -> bool:
+    """True when both SpeechBrain ECAPA and the Whisper checkpoint are on disk."""
+    whisper_root = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "whisper"
+    hf_root = Path(os.environ.get("HF_HOME", Path.home() / ".cache" / "huggingface")) / "hub"
+    # Exact name: "tiny.en.pt" must not count as "tiny"
+    whisper_ok = (whisper_root / f"{model_size}.pt").is_file()
+    ecapa_ok = (hf_root / "models--speechbrain--spkrec-ecapa-voxceleb").exists()
+    return whisper_ok and ecapa_ok
+
+
+def _vad_backends(use_real_models: bool = False) -> Dict[str, Callable]:
+    """VAD backends to time. Silero is only included when its torch.hub
+    checkout is already cached or real models were requested, so a stub run
+    never downloads it."""
+    from app.pipeline import vad
+
+    backends = {"vad_energy": lambda w, sr: vad._vad_energy(w, sr, 30)}
+    try:
+        import webrtcvad  # noqa: F401
+        backends["vad_webrtc"] = lambda w, sr: vad._vad_webrtc(w, sr, 30, 2)
+    except Exception:
+        pass
+    if not (use_real_models or vad.silero_checkout()):
+        return backends
+    try:
+        vad._get_silero()
+        backends["vad_silero"] = lambda w, sr: vad._vad_silero(w, sr, 30)
+    except Exception:
+        pass
+    return backends
+
+
+def run_benchmarks(
+    seconds: float = 60.0,
+    n_speakers: int = 3,
+    repeat: int = 3,
+    seed: int = 0,
+    use_real_models: bool = False,
+    asr_model: str = "tiny",
+    sr: int = 16000,
+    threads: int = 0,
+    cascade_excerpt_sec: float = 2.0,
+    max_segment_sec: float = 12.0,
+) -> Dict:
+    from app.audio.io import load_mono_audio, write_wav
+    from app.pipeline.config import PipelineConfig
+    from app.pipeline import vad
+    from app.pipeline.asr import transcribe_segments
+    from app.pipeline.diarization import assemble_audio, cascade_summary, label_segments_by_similarity
+    from app.pipeline.segmentation import split_long_intervals
+    from app.utils.threads import apply_thread_budget, plan_threads
+
+    budget = apply_thread_budget(plan_threads(PipelineConfig(cpu_threads=threads)))
+    wav, target, turns = make_mixture(seconds, n_speakers, sr=sr, seed=seed)
+    real = use_real_models and real_models_cached(asr_model)
+    models_ctx = nullcontext() if real else stub_models()
+    results: Dict[str, Dict] = {}
+
+    with models_ctx, tempfile.TemporaryDirectory() as tmp:
+        mix_path = Path(tmp) / "mixture.wav"
+        write_wav(mix_path, wav, sr)
+        results["load_mono_audio"] = _timeit(lambda: load_mono_audio(mix_path, target_sr=sr), repeat)
+
+        for name, fn in _vad_backends(real).items():
+            results[name] = _timeit(lambda: fn(wav, sr), repeat)
+
+        intervals = vad._vad_energy(wav, sr, 30)
+        # Splitting is opt-in in the pipeline; benchmarked at an explicit length
+        target_sec = PipelineConfig().target_segment_sec
+        results["split_intervals"] = _timeit(
+            lambda: split_long_intervals(wav, sr, intervals, max_segment_sec, target_sec), repeat
+        )
+        segments = split_long_intervals(wav, sr, intervals, max_segment_sec, target_sec)
+        if real:
+            from app.pipeline.embedding import get_speaker_embedding
+
+            tgt_emb = get_speaker_embedding(target, sr)
+        else:
+            tgt_emb = stub_embedding(target, sr)
+        labeled: List[Dict] = []
+
+        def _label():
+            labeled[:] = label_segments_by_similarity(wav, sr, segments, tgt_emb, threshold=0.6)
+
+        results["label_segments"] = _timeit(_label, repeat)
+        results["label_segments_cascade"] = _timeit(
+            lambda: label_segments_by_similarity(
+                wav, sr, segments, tgt_emb, threshold=0.6, cascade_excerpt_sec=cascade_excerpt_sec
+            ),
+            repeat,
+        )
+        # Untimed: audit every early exit to report agreement with full scoring
+        cascade = cascade_summary(
+            label_segments_by_similarity(
+                wav, sr, segments, tgt_emb, threshold=0.6, cascade_excerpt_sec=cascade_excerpt_sec, cascade_audit=1.0
+            ),
+            0.6,
+        )
+        results["assemble_audio"] = _timeit(lambda: assemble_audio(wav, sr, labeled, "Target"), repeat)
+        results["transcribe_segments"] = _timeit(
+            lambda: transcribe_segments(wav, sr, labeled, model_size=asr_model), repeat
+        )
+
+    truth_target = sum(1 for t in turns if t["speaker"] == 0)
+    return {
+        "meta": {
+            "seconds": seconds,
+            "speakers": n_speakers,
+            "repeat": repeat,
+            "seed": seed,
+            "models": "real" if real else "stub",
+            "intervals": len(intervals),
+            "segments": len(segments),
+            "max_segment_sec": max_segment_sec,
+            "target_turns": truth_target,
+            "labeled_target": sum(1 for s in labeled if s["speaker"] == "Target"),
+            "threads": budget.threads_per_worker,
+            "cascade": cascade,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.15) -> List[Dict]:
+    """Compare median timings; a stage regresses when it is slower than
+    baseline * (1 + tolerance)."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] > 0 else float("inf")
+        rows.append({
+            "stage": name,
+            "baseline_s": base["median_s"],
+            "current_s": cur["median_s"],
+            "ratio": ratio,
+            "regression": ratio > 1.0 + tolerance,
+        })
+    return rows
+
+
+def _print_results(report: Dict, rows: Optional[List[Dict]] = None) -> None:
+    meta = report["meta"]
+    print(f"{meta['seconds']:.0f}s mixture, {meta['speakers']} speakers, {meta['models']} models, {meta['intervals']} intervals")
+    for name, r in report["results"].items():
+        print(f"  {name:<22} median {r['median_s'] * 1000:9.1f} ms   min {r['min_s'] * 1000:9.1f} ms")
+    if rows:
+        print("Comparison against baseline:")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"  {row['stage']:<22} {row['ratio']:6.2f}x  {flag}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Offline stage benchmarks with synthetic mixtures")
+    p.add_argument("--seconds", type=float, default=60.0, help="Mixture length in seconds")
+    p.add_argument("--speakers", type=int, default=3, help="Number of synthetic speakers")
+    p.add_argument("--repeat", type=int, default=3, help="Timed repetitions per stage")
+    p.add_argument("--seed", type=int, default=0, help="Synthetic mixture seed")
+    p.add_argument("--real-models", action="store_true", help="Use real models if cached locally")
+    p.add_argument("--asr-model", default="tiny", help="Whisper size for --real-models")
+    p.add_argument("--threads", type=int, default=0, help="CPU threads for inference (default: all available cores)")
+    p.add_argument("--max-segment", type=float, default=12.0, help="Interval length above which split_intervals splits (0 = off)")
+    p.add_argument("--cascade", type=float, default=2.0, metavar="SEC", help="Excerpt length for the cascade labeling benchmark")
+    p.add_argument("--out", type=Path, default=None, help="Write results JSON here")
+    p.add_argument("--compare", type=Path, default=None, help="Baseline JSON to compare against")
+    p.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown ratio before flagging")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmarks(
+        seconds=args.seconds,
+        n_speakers=args.speakers,
+        repeat=args.repeat,
+        seed=args.seed,
+        use_real_models=args.real_models,
+        asr_model=args.asr_model,
+        threads=args.threads,
+        cascade_excerpt_sec=args.cascade,
+        max_segment_sec=args.max_segment,
+    )
+    rows = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        rows = compare(report, baseline, args.tolerance)
+        report["comparison"] = {"baseline": str(args.compare), "tolerance": args.tolerance, "rows": rows}
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    _print_results(report, rows)
+    return 1 if rows and any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
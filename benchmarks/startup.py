@@ -0,0 +1,130 @@
+"""
+Start-up benchmark.
+
+Runs each entry point in a fresh interpreter and times it end to end, then
+records which heavy model libraries the process had imported by the end.
+None of them should load before a pipeline stage needs them. `api_import`
+only imports the server module; `api_startup` also runs the app's lifespan
+(thread budget, job manager) through a TestClient, with model warm-up
+disabled so the figure covers the server's own start-up, not model loading.
+
+    python -m benchmarks.startup --repeat 5 --out startup.json
+    python -m benchmarks.startup --compare startup.json --tolerance 0.25
+
+The report has the same shape as benchmarks.run, so `compare` applies.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.run import _timeit, compare
+
+HEAVY_MODULES = ("torch", "torchaudio", "whisper", "speechbrain", "librosa")
+ROOT = Path(__file__).resolve().parents[1]
+
+# name -> python code run with `python -c`; "interpreter" is the floor for the others
+ENTRY_POINTS: Dict[str, str] = {
+    "interpreter": "pass",
+    "cli_help": "import sys; sys.argv = ['app.main', '--help']; import runpy; runpy.run_module('app.main', run_name='__main__')",
+    "import_app_main": "import app.main",
+    "api_import": "import app.api.server",
+    "api_startup": (
+        "import os, time; os.environ['VP_WARMUP_MODELS'] = 'none'\n"
+        "from fastapi.testclient import TestClient\n"
+        "from app.api.server import app\n"
+        "client = TestClient(app); client.__enter__()\n"
+        "while client.get('/ready').status_code != 200: time.sleep(0.001)\n"
+        "client.__exit__(None, None, None)"
+    ),
+}
+
+
+def _python(code: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=False
+    )
+
+
+def loaded_heavy_modules(code: str) -> List[str]:
+    """Heavy model libraries present in sys.modules after running `code`."""
+    probe = (
+        f"import sys\ntry:\n    exec({code!r})\nexcept SystemExit:\n    pass\n"
+        f"print('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    proc = _python(probe)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    line = proc.stdout.strip().splitlines()[-1]
+    return [m for m in line[len("heavy:"):].split(",") if m]
+
+
+def run_startup_benchmarks(repeat: int = 5, entry_points: Optional[Dict[str, str]] = None) -> Dict:
+    entry_points = entry_points or ENTRY_POINTS
+    results: Dict[str, Dict] = {}
+    heavy: Dict[str, List[str]] = {}
+    for name, code in entry_points.items():
+        def _run(code: str = code) -> None:
+            proc = _python(code)
+            if proc.returncode != 0:
+                raise RuntimeError(f"{name} failed: {proc.stderr.strip()}")
+
+        results[name] = _timeit(_run, repeat)
+        heavy[name] = loaded_heavy_modules(code)
+    return {
+        "meta": {
+            "repeat": repeat,
+            "heavy_modules_loaded": heavy,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def _print_results(report: Dict, rows: Optional[List[Dict]] = None) -> None:
+    base = report["results"].get("interpreter", {}).get("median_s", 0.0)
+    for name, r in report["results"].items():
+        heavy = report["meta"]["heavy_modules_loaded"].get(name) or []
+        extra = f"   loads: {', '.join(heavy)}" if heavy else ""
+        print(f"  {name:<18} median {r['median_s'] * 1000:8.1f} ms   (+{(r['median_s'] - base) * 1000:7.1f} ms){extra}")
+    if rows:
+        print("Comparison against baseline:")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"  {row['stage']:<18} {row['ratio']:6.2f}x  {flag}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Start-up time of the CLI and API entry points")
+    p.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point")
+    p.add_argument("--out", type=Path, default=None, help="Write results JSON here")
+    p.add_argument("--compare", type=Path, default=None, help="Baseline JSON to compare against")
+    p.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown ratio before flagging")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_startup_benchmarks(repeat=args.repeat)
+    rows = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        rows = compare(report, baseline, args.tolerance)
+        report["comparison"] = {"baseline": str(args.compare), "tolerance": args.tolerance, "rows": rows}
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    _print_results(report, rows)
+    return 1 if rows and any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
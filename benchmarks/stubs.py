@@ -0,0 +1,68 @@
+"""
+Deterministic stand-ins for the speaker encoder and Whisper.
+
+The stub encoder projects a coarse log-spectrum onto a fixed random basis,
+so segments from the same synthetic voice land close together and labeling
+behaves realistically; the stub ASR returns a fixed string per segment.
+Both cost a small, stable amount of CPU so benchmark timings reflect the
+pipeline around the models rather than the models themselves.
+"""
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List
+from unittest import mock
+
+import numpy as np
+
+EMB_DIM = 192
+_N_FFT = 1024
+_N_BANDS = 64
+_PROJ = np.random.default_rng(1234).standard_normal((_N_BANDS, EMB_DIM)).astype(np.float32)
+
+
+def stub_embedding(wav: np.ndarray, sr: int, device: str = "cpu") -> np.ndarray:
+    if len(wav) < _N_FFT:
+        wav = np.pad(wav, (0, _N_FFT - len(wav)))
+    frames = len(wav) // _N_FFT
+    spec = np.abs(np.fft.rfft(wav[: frames * _N_FFT].reshape(frames, _N_FFT), axis=1)).mean(axis=0)
+    # Pitch region only (~0-2 kHz at 16 kHz), where the synthetic voices differ
+    low = spec[1 : 1 + 2 * _N_BANDS]
+    bands = np.sqrt(low.reshape(_N_BANDS, 2).sum(axis=1) / (low.sum() + 1e-9))
+    bands = ((bands - bands.mean()) / (bands.std() + 1e-9)).astype(np.float32)
+    emb = bands @ _PROJ
+    return emb / (np.linalg.norm(emb) + 1e-9)
+
+
+def stub_embeddings(wavs: List[np.ndarray], sr: int, device: str = "cpu") -> List[np.ndarray]:
+    return [stub_embedding(w, sr, device) for w in wavs]
+
+
+def stub_asr_segment(wav_seg: np.ndarray, sr: int, model_size: str = "tiny") -> Dict:
+    n_words = max(1, int(len(wav_seg) / sr * 2.5))
+    return {"text": " ".join(["lorem"] * n_words), "confidence": 0.0}
+
+
+def stub_asr_batch(segs: List[np.ndarray], sr: int, model_size: str = "tiny") -> List[Dict]:
+    return [stub_asr_segment(s, sr, model_size) for s in segs]
+
+
+def stub_load_model(*args, **kwargs) -> None:
+    """Model loaders are called before a batcher starts; nothing to load here."""
+    return None
+
+
+@contextmanager
+def stub_models() -> Iterator[None]:
+    """Route every model call site in the pipeline to the stubs."""
+    targets = [
+        ("app.pipeline.embedding", "get_speaker_embedding", stub_embedding),
+        ("app.pipeline.embedding", "get_speaker_embeddings", stub_embeddings),
+        ("app.pipeline.diarization", "get_speaker_embedding", stub_embedding),
+        ("app.pipeline.asr", "_asr_whisper_segment", stub_asr_segment),
+        ("app.pipeline.asr", "_asr_whisper_batch", stub_asr_batch),
+        ("app.pipeline.embedding", "_get_classifier", stub_load_model),
+        ("app.pipeline.asr", "_get_whisper_model", stub_load_model),
+    ]
+    with ExitStack() as stack:
+        for module, attr, fn in targets:
+            stack.enter_context(mock.patch(f"{module}.{attr}", fn))
+        yield
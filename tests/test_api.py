@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture()
+def client(tmp_path: Path, monkeypatch):
+    pytest.importorskip("numpy")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import app.main
+    from app.api import jobs as jobs_mod
+    from app.api import server
+
+    def fake_pipeline(mixture_path, target_path, out_dir, cfg, progress=None):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "diarization.json").write_text("[]", encoding="utf-8")
+        (out_dir / "inputs.txt").write_text(f"{mixture_path}\n{target_path}", encoding="utf-8")
+
+    monkeypatch.setattr(app.main, "run_pipeline", fake_pipeline)
+    monkeypatch.setattr(server, "jobs", jobs_mod.JobManager(tmp_path, max_workers=1, max_queued=4))
+    yield TestClient(server.app)
+    server.jobs.shutdown()
+
+
+def test_uploads_stream_into_the_job_directory(client, tmp_path: Path):
+    files = {"mixture": ("mix.MP3", b"m" * 2048), "target": ("ref.wav", b"t" * 16)}
+    r = client.post("/run", files=files, data={"out_dir": "results"})
+    assert r.status_code == 200, r.text
+    out = Path(r.json()["diarization_json"]).parent
+    assert out.parent.parent == tmp_path and out.name == "results"
+    assert (out / "inputs.txt").read_text().splitlines()[0].endswith("inputs/mixture.mp3")
+
+    assert client.post("/jobs", files={"mixture": files["mixture"]}).status_code == 400
+    assert client.post("/jobs", files=files, data={"out_dir": "../elsewhere"}).status_code == 400
+    # Rejected on Content-Length before the body is read
+    r = client.post(
+        "/jobs",
+        content=b"",
+        headers={"content-type": "multipart/form-data; boundary=x", "content-length": str(1 << 40)},
+    )
+    assert r.status_code == 413
+    assert sorted(p.name for p in tmp_path.iterdir()) == [out.parent.name]
+
+
+def test_unknown_model_or_device_is_rejected(client, tmp_path: Path):
+    files = {"mixture": ("mix.wav", b"m"), "target": ("ref.wav", b"t")}
+    for data in ({"asr_model": "bogus"}, {"device": "dev1"}, {"device": "cuda:0\""}, {"threshold": "high"}):
+        assert client.post("/jobs", files=files, data=data).status_code == 422, data
+    assert client.post("/jobs", files=files, data={"asr_model": "base.en", "device": "cuda:1"}).status_code == 202
+
+
+def test_form_field_count_and_chunked_body_size_are_bounded(client, monkeypatch, tmp_path: Path):
+    from functools import partial
+
+    from app.api import forms, server
+
+    files = {"mixture": ("mix.wav", b"m"), "target": ("ref.wav", b"t")}
+    monkeypatch.setattr(forms, "MAX_FIELDS", 3)
+    many = {f"f{i}": "x" for i in range(4)}
+    assert client.post("/jobs", files=files, data=many).status_code == 400
+
+    # No Content-Length: the received bytes are counted instead
+    monkeypatch.setattr(server, "receive_form", partial(forms.receive_form, max_bytes=64 * 1024))
+    body = b"--x\r\n" + b"y" * (1 << 20)
+
+    def chunks():
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    r = client.post("/jobs", content=chunks(), headers={"content-type": "multipart/form-data; boundary=x"})
+    assert r.status_code == 413
+    # The rejected job's partial upload is discarded
+    assert not list(tmp_path.glob("*/inputs/*"))
@@ -0,0 +1,56 @@
+import io
+from pathlib import Path
+
+import pytest
+
+
+def test_load_mono_audio_from_buffer_matches_file(tmp_path: Path):
+    np = pytest.importorskip("numpy")
+    sf = pytest.importorskip("soundfile")
+    from app.audio.io import load_mono_audio
+
+    stereo = np.random.default_rng(0).normal(scale=0.1, size=(44100, 2)).astype(np.float32)
+    path = tmp_path / "x.wav"
+    sf.write(str(path), stereo, 44100)
+
+    from_file, sr = load_mono_audio(path, target_sr=16000)
+    buf = io.BytesIO(path.read_bytes())
+    from_buf, sr2 = load_mono_audio(buf, target_sr=16000)
+    assert sr == sr2 == 16000
+    assert from_file.dtype == np.float32
+    assert len(from_file) == 16000
+    np.testing.assert_array_equal(from_file, from_buf)
+
+
+def test_stream_to_file_enforces_limit(tmp_path: Path):
+    from app.utils.uploads import UploadTooLargeError, stream_to_file
+
+    dest = tmp_path / "up.bin"
+    assert stream_to_file(io.BytesIO(b"x" * 10), dest, max_bytes=10, chunk_size=3) == 10
+    assert dest.read_bytes() == b"x" * 10
+    with pytest.raises(UploadTooLargeError):
+        stream_to_file(io.BytesIO(b"x" * 11), dest, max_bytes=10, chunk_size=3)
+    assert not dest.exists()
+
+
+def test_upload_sink_spills_to_disk_once_and_enforces_limit(tmp_path: Path):
+    from app.utils.uploads import UploadSink, UploadTooLargeError
+
+    small = UploadSink(tmp_path / "small.wav", max_bytes=100, inmemory_max=10)
+    small.write(b"abc")
+    buf = small.finish()
+    assert buf.read() == b"abc" and buf.name == "small.wav"
+    assert not (tmp_path / "small.wav").exists()
+
+    big = UploadSink(tmp_path / "big.wav", max_bytes=100, inmemory_max=10)
+    for _ in range(5):
+        big.write(b"x" * 8)
+    assert big.finish() == tmp_path / "big.wav"
+    assert (tmp_path / "big.wav").read_bytes() == b"x" * 40
+
+    over = UploadSink(tmp_path / "over.wav", max_bytes=100, inmemory_max=10)
+    over.write(b"x" * 60)
+    with pytest.raises(UploadTooLargeError):
+        over.write(b"x" * 60)
+    over.discard()
+    assert not (tmp_path / "over.wav").exists()
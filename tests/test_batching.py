@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    pytest.importorskip("numpy")
+    from app.pipeline.batching import MicroBatcher
+
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        return [x * 2 for x in items]
+
+    b = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    futures = b.map(range(10))
+    assert [f.result(5) for f in futures] == [x * 2 for x in range(10)]
+    assert max(sizes) == 4
+    assert sum(sizes) == 10
+
+    results = {}
+
+    def caller(i):
+        results[i] = b.submit(i).result(5)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {i: i * 2 for i in range(8)}
+    stats = b.stats()
+    assert stats["requests"] == 18
+    assert stats["mean_batch_size"] > 1
+    b.close()
+
+
+def test_micro_batcher_isolates_failures():
+    pytest.importorskip("numpy")
+    from app.pipeline.batching import MicroBatcher
+
+    def batch_fn(items):
+        if any(x < 0 for x in items):
+            raise ValueError("negative")
+        return items
+
+    b = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    good, bad = b.map([1, -1])
+    assert good.result(5) == 1
+    with pytest.raises(ValueError):
+        bad.result(5)
+    b.close()
+
+
+def test_batcher_is_not_created_when_its_model_fails_to_load(monkeypatch):
+    import threading
+
+    from app.pipeline import asr, batching
+
+    def fail(model_size):
+        raise RuntimeError(f"no such model: {model_size}")
+
+    monkeypatch.setattr(asr, "_get_whisper_model", fail)
+    before = {t.name for t in threading.enumerate()}
+    with pytest.raises(RuntimeError):
+        batching.asr_batcher(16000, model_size="bogus")
+    assert ("asr", 16000, "bogus") not in batching._BATCHERS
+    assert {t.name for t in threading.enumerate()} - before == set()
+
+
+def test_micro_batcher_serves_submitters_round_robin():
+    pytest.importorskip("numpy")
+    from app.pipeline.batching import MicroBatcher
+
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def batch_fn(items):
+        started.set()
+        release.wait(5)
+        batches.append(list(items))
+        return items
+
+    b = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=0)
+    first = b.submit(("long", 0), submitter="long")
+    assert started.wait(5)
+    # A long job queues everything at once; a short job arrives just after it
+    rest = b.map([("long", i) for i in range(1, 21)], submitter="long")
+    short = b.submit(("short", 0), submitter="short")
+    release.set()
+    assert short.result(5) == ("short", 0)
+    assert [f.result(5) for f in [first] + rest] == [("long", i) for i in range(21)]
+    b.close()
+    assert ("short", 0) in batches[1]
+
+
+def test_concurrent_first_calls_load_the_encoder_once(monkeypatch):
+    pytest.importorskip("numpy")
+    import time
+
+    from app.pipeline import embedding
+
+    loads = []
+
+    class SlowEncoder:
+        @classmethod
+        def from_hparams(cls, source, run_opts, savedir=None):
+            loads.append(run_opts["device"])
+            time.sleep(0.05)
+            return object()
+
+    monkeypatch.setattr(embedding, "patch_torchaudio_backends", lambda: None)
+    monkeypatch.setattr(embedding, "_resolve_encoder_classifier", lambda: SlowEncoder)
+    monkeypatch.setattr(embedding, "_SB_CLASSIFIERS", {})
+    got = []
+    callers = [threading.Thread(target=lambda: got.append(embedding._get_classifier("cpu"))) for _ in range(4)]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    assert loads == ["cpu"] and len({id(m) for m in got}) == 1
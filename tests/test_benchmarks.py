@@ -0,0 +1,73 @@
+import pytest
+
+
+def test_benchmark_harness_runs_offline_with_stubs():
+    pytest.importorskip("numpy")
+    pytest.importorskip("soundfile")
+    from benchmarks.run import compare, run_benchmarks
+
+    report = run_benchmarks(seconds=10.0, n_speakers=2, repeat=1)
+    assert report["meta"]["models"] == "stub"
+    for stage in ("load_mono_audio", "vad_energy", "label_segments", "assemble_audio", "transcribe_segments"):
+        assert report["results"][stage]["median_s"] >= 0.0
+    assert report["meta"]["labeled_target"] == report["meta"]["target_turns"]
+
+    slower = {"results": {k: dict(v, median_s=v["median_s"] * 2 + 1e-3) for k, v in report["results"].items()}}
+    rows = compare(slower, report, tolerance=0.15)
+    assert rows and all(r["regression"] for r in rows)
+    assert not any(r["regression"] for r in compare(report, report))
+
+
+def test_stub_run_skips_silero_unless_its_checkout_is_cached(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    from app.pipeline import vad
+    from benchmarks.run import _vad_backends
+
+    def no_download():
+        raise AssertionError("Silero must not be fetched in a stub run")
+
+    monkeypatch.setenv("TORCH_HOME", str(tmp_path))
+    monkeypatch.setattr(vad, "_get_silero", no_download)
+    assert vad.silero_checkout() is None
+    assert "vad_silero" not in _vad_backends()
+
+    checkout = tmp_path / "hub" / "snakers4_silero-vad_master"
+    checkout.mkdir(parents=True)
+    (checkout / "hubconf.py").write_text("")
+    assert vad.silero_checkout() == checkout
+
+
+def test_real_models_cached_matches_the_exact_whisper_checkpoint(tmp_path, monkeypatch):
+    from benchmarks.run import real_models_cached
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("HF_HOME", str(tmp_path / "hf"))
+    (tmp_path / "hf" / "hub" / "models--speechbrain--spkrec-ecapa-voxceleb").mkdir(parents=True)
+    (tmp_path / "whisper").mkdir()
+    (tmp_path / "whisper" / "tiny.en.pt").write_bytes(b"")
+    assert not real_models_cached("tiny")
+    assert real_models_cached("tiny.en")
+
+
+def test_on_segment_reports_every_diarization_entry(tmp_path):
+    pytest.importorskip("numpy")
+    sf = pytest.importorskip("soundfile")
+    import json
+
+    from app.main import run_pipeline
+    from app.pipeline.config import PipelineConfig
+    from benchmarks.stubs import stub_models
+    from benchmarks.synthetic import make_mixture
+
+    wav, target, _ = make_mixture(30.0, 3, seed=2)
+    sf.write(tmp_path / "m.wav", wav, 16000)
+    sf.write(tmp_path / "t.wav", target, 16000)
+    seen = []
+    with stub_models():
+        run_pipeline(
+            tmp_path / "m.wav", tmp_path / "t.wav", tmp_path / "out",
+            PipelineConfig(transcribe_only_target=True), on_segment=seen.append,
+        )
+    entries = json.loads((tmp_path / "out" / "diarization.json").read_text())
+    assert any(e["speaker"] != "Target" for e in entries)
+    assert sorted(e["start"] for e in seen) == [e["start"] for e in entries]
@@ -0,0 +1,37 @@
+import pytest
+
+
+def test_cascade_escalates_only_uncertain_segments():
+    pytest.importorskip("numpy")
+    from benchmarks.stubs import stub_embedding, stub_embeddings, stub_models
+    from benchmarks.synthetic import make_mixture
+    from app.pipeline.batching import MicroBatcher
+    from app.pipeline.diarization import cascade_summary, label_segments_by_similarity
+
+    sr = 16000
+    wav, target, turns = make_mixture(30.0, 2, sr=sr, seed=3)
+    intervals = [(t["start"], t["end"]) for t in turns]
+    tgt = stub_embedding(target, sr)
+
+    with stub_models():
+        full = label_segments_by_similarity(wav, sr, intervals, tgt, threshold=0.6)
+        assert {s["scored_by"] for s in full} == {"full"}
+
+        # A band wider than any score distance escalates everything: same labels as full scoring
+        wide = label_segments_by_similarity(wav, sr, intervals, tgt, 0.6, cascade_excerpt_sec=0.5, cascade_band=2.0)
+        assert [s["speaker"] for s in wide] == [s["speaker"] for s in full]
+        assert cascade_summary(wide, 0.6)["early_exit"] == 0
+
+        batcher = MicroBatcher(lambda segs: stub_embeddings(segs, sr), max_batch_size=4, max_wait_ms=1)
+        try:
+            narrow = label_segments_by_similarity(
+                wav, sr, intervals, tgt, 0.6, batcher=batcher,
+                cascade_excerpt_sec=0.5, cascade_band=0.0, cascade_audit=1.0,
+            )
+        finally:
+            batcher.close()
+    report = cascade_summary(narrow, 0.6)
+    long_segments = sum(1 for s, e in intervals if (e - s) > 0.75)
+    assert report["early_exit"] == report["audited"] == long_segments > 0
+    assert 0.0 <= report["agreement"] <= 1.0
+    assert all(("full_score" in s) == (s["scored_by"] == "excerpt") for s in narrow)
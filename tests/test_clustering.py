@@ -0,0 +1,30 @@
+import pytest
+
+
+def test_cluster_embeddings_separates_speakers():
+    np = pytest.importorskip("numpy")
+    from app.pipeline.clustering import cluster_embeddings
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(3, 192))
+    embs = []
+    expected = []
+    for i in range(60):
+        c = i % 3
+        v = centers[c] + 0.05 * rng.normal(size=192)
+        embs.append(v / np.linalg.norm(v))
+        expected.append(c)
+
+    labels = cluster_embeddings(embs, threshold=0.5)
+    assert labels[:3] == [0, 1, 2]
+    assert labels == expected
+
+
+def test_cluster_embeddings_respects_max_speakers():
+    np = pytest.importorskip("numpy")
+    from app.pipeline.clustering import cluster_embeddings
+
+    embs = list(np.eye(8))
+    labels = cluster_embeddings(embs, threshold=0.9, max_speakers=3)
+    assert max(labels) == 2
+    assert cluster_embeddings([]) == []
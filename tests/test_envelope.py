@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import pytest
+
+
+def test_envelope_pyramid_levels_and_window(tmp_path: Path):
+    np = pytest.importorskip("numpy")
+    from app.audio.envelope import build_envelope_pyramid, load_envelope, write_envelope
+
+    sr = 16000
+    wav = np.random.default_rng(0).uniform(-1, 1, sr * 600 + 123).astype(np.float32)
+    levels = build_envelope_pyramid(wav, base_block=256, factor=4, top_bins=1024)
+    assert len(levels[-1]) <= 1024
+    assert levels[0][0, 0] == wav[:256].min() and levels[0][0, 1] == wav[:256].max()
+    for lv in levels:
+        assert lv[:, 0].min() == wav.min() and lv[:, 1].max() == wav.max()
+
+    write_envelope(tmp_path, wav, sr)
+    env = load_envelope(tmp_path)
+    assert env.duration == pytest.approx(len(wav) / sr)
+    for t0, t1 in ((0.0, env.duration), (100.0, 101.0), (250.0, 400.0)):
+        times, mins, maxs = env.window(t0, t1, max_bins=500)
+        assert len(times) <= 500
+        assert times[0] <= t0 + 1e-6 and (mins <= maxs).all()
+    assert env.choose_level(0.0, 1.0) == 0
+
+
+def test_speaker_overlay_merges_runs_and_stays_within_bin_budget():
+    pytest.importorskip("numpy")
+    from app.audio.envelope import speaker_spans
+
+    segs = [
+        {"start": 0.0, "end": 1.0, "speaker": "Target"},
+        {"start": 1.0, "end": 2.0, "speaker": "Target"},
+        {"start": 3.0, "end": 4.0, "speaker": "Other"},
+    ]
+    assert speaker_spans(segs, 0.0, 5.0, max_bins=50) == [
+        pytest.approx((0.0, 2.0, "Target")), pytest.approx((3.0, 4.0, "Other")),
+    ]
+    # 10k alternating 0.1 s turns over 1000 s: one span per bin at most
+    many = [{"start": i * 0.1, "end": (i + 1) * 0.1, "speaker": "AB"[i % 2]} for i in range(10000)]
+    spans = speaker_spans(many, 0.0, 1000.0, max_bins=1500)
+    assert 0 < len(spans) <= 1500
+    assert speaker_spans(many, 200.0, 200.35, max_bins=1500)[0][2] == "A"
@@ -15,3 +15,12 @@ def test_import_pipeline_modules():
     import app.audio.io  # noqa: F401
     import app.api.server  # noqa: F401
     import app.utils.logging  # noqa: F401
+
+
+def test_entry_points_do_not_import_model_libraries():
+    pytest.importorskip("numpy")
+    pytest.importorskip("fastapi")
+    from benchmarks.startup import ENTRY_POINTS, loaded_heavy_modules
+
+    for name in ("cli_help", "api_import", "api_startup"):
+        assert loaded_heavy_modules(ENTRY_POINTS[name]) == [], name
@@ -0,0 +1,90 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+
+def _fake_pipeline(gate: threading.Event):
+    def run_pipeline(mixture_path, target_path, out_dir, cfg, progress=None):
+        progress("load")
+        gate.wait(5)
+        progress("asr")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "diarization.json").write_text("[]", encoding="utf-8")
+
+    return run_pipeline
+
+
+def test_job_queue_limits_and_cancel(tmp_path: Path, monkeypatch):
+    pytest.importorskip("numpy")
+    import app.main
+    from app.api import jobs as jobs_mod
+    from app.pipeline.config import PipelineConfig
+
+    gate = threading.Event()
+    monkeypatch.setattr(app.main, "run_pipeline", _fake_pipeline(gate))
+    mgr = jobs_mod.JobManager(tmp_path, max_workers=1, max_queued=1)
+
+    running = mgr.create()
+    mgr.submit(running, Path("m.wav"), Path("t.wav"), PipelineConfig())
+    while running.status != jobs_mod.RUNNING:
+        time.sleep(0.01)
+    queued = mgr.create()
+    mgr.submit(queued, Path("m.wav"), Path("t.wav"), PipelineConfig())
+    with pytest.raises(jobs_mod.QueueFullError):
+        mgr.create()
+
+    assert mgr.cancel(queued.id).status == jobs_mod.CANCELLED
+    mgr.cancel(running.id)
+    gate.set()
+    with pytest.raises(jobs_mod.JobCancelled):
+        running.future.result(5)
+    assert running.status == jobs_mod.CANCELLED
+    assert running.dir != queued.dir
+    mgr.shutdown()
+
+
+def test_job_succeeds_in_isolated_dir(tmp_path: Path, monkeypatch):
+    pytest.importorskip("numpy")
+    import app.main
+    from app.api import jobs as jobs_mod
+    from app.pipeline.config import PipelineConfig
+
+    gate = threading.Event()
+    gate.set()
+    monkeypatch.setattr(app.main, "run_pipeline", _fake_pipeline(gate))
+    mgr = jobs_mod.JobManager(tmp_path, max_workers=2, max_queued=4)
+    job = mgr.create()
+    mgr.submit(job, Path("m.wav"), Path("t.wav"), PipelineConfig())
+    assert job.future.result(5) == tmp_path / job.id
+    assert job.status == jobs_mod.SUCCEEDED
+    assert (tmp_path / job.id / "diarization.json").exists()
+    assert not job.input_dir.exists()
+    mgr.shutdown()
+
+
+def test_out_dir_stays_inside_job_and_pruned_jobs_free_disk(tmp_path: Path, monkeypatch):
+    pytest.importorskip("numpy")
+    import app.main
+    from app.api import jobs as jobs_mod
+    from app.pipeline.config import PipelineConfig
+
+    gate = threading.Event()
+    gate.set()
+    monkeypatch.setattr(app.main, "run_pipeline", _fake_pipeline(gate))
+    mgr = jobs_mod.JobManager(tmp_path, max_workers=1, max_queued=4, max_history=1)
+    for bad in ("/tmp/shared", "../other", "a/../../b"):
+        with pytest.raises(jobs_mod.InvalidOutputDir):
+            mgr.create(bad)
+
+    first = mgr.create("results")
+    assert first.out_dir == first.dir / "results"
+    mgr.submit(first, Path("m.wav"), Path("t.wav"), PipelineConfig())
+    first.future.result(5)
+    assert (first.out_dir / "diarization.json").exists()
+
+    second = mgr.create("results")
+    assert second.out_dir != first.out_dir
+    assert mgr.get(first.id) is None and not first.dir.exists()
+    mgr.shutdown()
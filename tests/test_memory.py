@@ -0,0 +1,17 @@
+import pytest
+
+from app.utils.memory import StageMemory, current_rss
+
+
+def test_stage_memory_tracks_peak_and_allocations():
+    np = pytest.importorskip("numpy")
+    if current_rss() is None:
+        pytest.skip("RSS not available on this platform")
+
+    with StageMemory(interval=0.001, top_n=3) as mem:
+        buf = np.ones(16 * 1024 * 1024 // 8)  # 16 MiB
+        del buf
+    report = mem.as_dict()
+    assert report["rss_peak_mb"] >= report["rss_before_mb"]
+    assert report["py_peak_mb"] >= 15.0
+    assert len(report["top_allocations"]) <= 3
@@ -0,0 +1,25 @@
+from app.utils.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_registry_renders_prometheus_text():
+    reg = Registry()
+    hist = reg.register(Histogram("t_seconds", "test", labels=("stage",), buckets=(0.1, 1.0)))
+    hist.observe(0.05, stage="vad")
+    hist.observe(0.1, stage="vad")
+    hist.observe(5.0, stage="vad")
+    count = reg.register(Counter("t_total", "test", labels=("model",)))
+    count.inc(model="ecapa")
+    count.inc(model='we"ird\nname')
+    gauge = reg.register(Gauge("t_depth", "test"))
+    gauge.set_function(lambda: 3)
+
+    text = reg.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{stage="vad",le="0.1"} 2' in text
+    assert 't_seconds_bucket{stage="vad",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="vad",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="vad"} 3' in text
+    assert 't_total{model="ecapa"} 1' in text
+    assert 't_total{model="we\\"ird\\nname"} 1' in text
+    assert 't_depth 3' in text
+    assert hist.count(stage="vad") == 3
@@ -0,0 +1,57 @@
+import json
+import os
+from pathlib import Path
+
+from app.search.index import TranscriptIndex
+
+
+def _write_run(run_dir: Path, segments) -> None:
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "diarization.json").write_text(json.dumps(segments), encoding="utf-8")
+
+
+def test_index_updates_incrementally_and_queries(tmp_path: Path):
+    runs = tmp_path / "runs"
+    _write_run(runs / "job_a", [
+        {"speaker": "Target", "start": 1.25, "end": 3.5, "text": "Welcome back to the show"},
+        {"speaker": "Other", "start": 4.0, "end": 5.0, "text": "Thanks, great to be back"},
+        {"speaker": "Other", "start": 5.5, "end": 6.0, "text": ""},
+    ])
+    _write_run(runs / "nested" / "job_b", [
+        {"speaker": "Target", "start": 0.0, "end": 2.0, "text": "Back to work tomorrow"},
+    ])
+
+    with TranscriptIndex(tmp_path / "index.sqlite") as index:
+        stats = index.update([runs])
+        assert (stats.added, stats.segments) == (2, 3)
+        assert index.update([runs]).unchanged == 2
+
+        hits = index.search("back", speaker="Target")
+        assert [(h.run_id, h.start_ms, h.end_ms) for h in hits] == [("job_a", 1250, 3500), ("nested/job_b", 0, 2000)]
+        assert [h.run_id for h in index.search("welc* show")] == ["job_a"]
+        assert [h.text for h in index.search("back to", phrase=True)] == ["Welcome back to the show", "Back to work tomorrow"]
+        assert index.search("to back", phrase=True) == []
+
+        _write_run(runs / "job_a", [{"speaker": "Target", "start": 2.0, "end": 3.0, "text": "Something else"}])
+        os.utime(runs / "job_a" / "diarization.json", ns=(1, 1))
+        stats = index.update([runs])
+        assert (stats.updated, stats.unchanged) == (1, 1)
+        assert [h.run_id for h in index.search("back")] == ["nested/job_b"]
+
+        (runs / "nested" / "job_b" / "diarization.json").unlink()
+        assert index.update([runs], prune=True).removed == 1
+        assert index.counts()["runs"] == 1
+
+
+def test_overlapping_roots_and_malformed_runs_do_not_abort_ingest(tmp_path: Path):
+    jobs = tmp_path / "outputs" / "jobs"
+    _write_run(jobs / "a1" / "results", [{"speaker": "Target", "start": 0.0, "end": 1.0, "text": "alpha"}])
+    _write_run(jobs / "b2" / "results", [{"speaker": "Target", "start": 0.0, "end": 1.0, "text": "alpha"}])
+    _write_run(jobs / "bad_dict", {"speaker": "Target"})
+    _write_run(jobs / "bad_list", [5])
+
+    with TranscriptIndex(tmp_path / "index.sqlite") as index:
+        stats = index.update([tmp_path / "outputs", jobs])
+        assert (stats.added, stats.failed) == (2, 2)
+        # Every API job writes to <job>/results; ids keep them apart
+        assert [h.run_id for h in index.search("alpha")] == ["jobs/a1/results", "jobs/b2/results"]
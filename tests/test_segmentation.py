@@ -0,0 +1,37 @@
+import pytest
+
+
+def test_split_long_intervals_bounds_length_and_cuts_in_pauses():
+    np = pytest.importorskip("numpy")
+    from app.pipeline.segmentation import split_long_intervals
+
+    sr = 16000
+    t = np.arange(40 * sr) / sr
+    wav = (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    pauses = [10.0, 18.5, 25.0, 33.0]
+    for p in pauses:
+        wav[int(p * sr):int((p + 0.3) * sr)] *= 0.01
+
+    intervals = [(0.0, 3.0), (3.5, 40.0)]
+    out = split_long_intervals(wav, sr, intervals, max_sec=10.0, target_sec=8.0, search_sec=2.0)
+
+    assert out[0] == (0.0, 3.0)
+    pieces = out[1:]
+    assert pieces[0][0] == 3.5 and pieces[-1][1] == 40.0
+    assert all(a[1] == b[0] for a, b in zip(pieces, pieces[1:]))
+    assert all(e - s <= 10.0 for s, e in pieces)
+    # Every cut lands inside one of the quiet stretches
+    for _, cut in pieces[:-1]:
+        assert any(p <= cut <= p + 0.3 for p in pauses), cut
+
+    assert split_long_intervals(wav, sr, intervals, max_sec=0) == intervals
+
+
+def test_long_interval_splitting_is_opt_in():
+    from app.main import parse_args
+    from app.pipeline.config import PipelineConfig
+
+    # Existing users keep VAD intervals as segments unless they ask for splitting
+    assert PipelineConfig().max_segment_sec == 0
+    assert parse_args(["m.wav", "t.wav"]).max_segment == 0
+    assert parse_args(["m.wav", "t.wav", "--max-segment", "12"]).max_segment == 12.0
@@ -0,0 +1,56 @@
+import os
+
+from app.pipeline.config import PipelineConfig
+from app.utils import threads
+
+
+def test_plan_threads_splits_cores_between_workers():
+    budget = threads.plan_threads(PipelineConfig(cpu_threads=8, concurrent_jobs=4))
+    assert (budget.inference_workers, budget.threads_per_worker) == (4, 2)
+
+    # Batched inference runs on the two batcher workers, not on every job
+    batched = threads.plan_threads(PipelineConfig(cpu_threads=8, concurrent_jobs=4, inference_batching=True))
+    assert (batched.inference_workers, batched.threads_per_worker) == (2, 4)
+
+    # Never below one thread, even with more jobs than cores
+    assert threads.plan_threads(PipelineConfig(cpu_threads=2, concurrent_jobs=6)).threads_per_worker == 1
+
+
+def test_apply_thread_budget_sets_environment(monkeypatch):
+    monkeypatch.setattr(threads, "_APPLIED", None)
+    for var in threads.THREAD_ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+
+    budget = threads.plan_threads(PipelineConfig(cpu_threads=3))
+    threads.apply_thread_budget(budget)
+    assert all(os.environ[var] == "3" for var in threads.THREAD_ENV_VARS)
+    # A budget is already in effect, so the config's own plan is not re-applied
+    assert threads.ensure_thread_budget(PipelineConfig(cpu_threads=1)) == budget
+    assert threads.effective_threads()["budget"]["threads_per_worker"] == 3
+
+
+def test_torch_threads_are_set_lazily_when_torch_is_loaded(monkeypatch):
+    import sys
+    import types
+
+    calls = []
+    fake = types.SimpleNamespace(
+        set_num_threads=lambda n: calls.append(("intra", n)),
+        set_num_interop_threads=lambda n: calls.append(("interop", n)),
+    )
+    monkeypatch.setattr(threads, "_APPLIED", None)
+    monkeypatch.setattr(threads, "_TORCH_BUDGET", None)
+    monkeypatch.delitem(sys.modules, "torch", raising=False)
+
+    threads.apply_thread_budget(threads.plan_threads(PipelineConfig(cpu_threads=2)))
+    assert "torch" not in sys.modules and not calls
+
+    # A model loader imports torch, then configures it; repeat calls are free
+    monkeypatch.setitem(sys.modules, "torch", fake)
+    threads.configure_torch()
+    threads.configure_torch()
+    assert calls == [("intra", 2), ("interop", 1)]
+
+    # Once torch is loaded, a new budget applies to it straight away
+    threads.apply_thread_budget(threads.plan_threads(PipelineConfig(cpu_threads=4)))
+    assert calls[-1] == ("intra", 4) and len(calls) == 3
@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from app.utils import tracing
+
+
+def test_span_is_noop_without_tracer():
+    assert tracing.current_tracer() is None
+    assert tracing.span("x") is tracing.span("y")
+
+
+def test_tracer_exports_chrome_trace(tmp_path: Path):
+    tracer = tracing.Tracer(profile_stages=["work"], profile_dir=tmp_path)
+    with tracing.activate(tracer):
+        with tracing.span("outer", n=1):
+            with tracing.span("inner"), tracing.maybe_profile("work"):
+                sum(range(1000))
+    assert tracing.current_tracer() is None
+
+    data = json.loads(tracer.export(tmp_path / "trace.json").read_text())
+    events = {e["name"]: e for e in data["traceEvents"] if e["ph"] == "X"}
+    assert set(events) == {"outer", "inner"}
+    assert events["outer"]["args"] == {"n": 1}
+    assert events["outer"]["dur"] >= events["inner"]["dur"]
+    assert (tmp_path / "profile_work.prof").exists()
+
+
+def test_spans_inside_a_micro_batch_reach_every_submitting_tracer():
+    import pytest
+
+    pytest.importorskip("numpy")
+    from app.pipeline.batching import MicroBatcher
+
+    def batch_fn(items):
+        with tracing.span("model", size=len(items)):
+            return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=200, name="t")
+    a, b = tracing.Tracer(), tracing.Tracer()
+    try:
+        with tracing.activate(a):
+            fa = batcher.submit(1)
+        with tracing.activate(b):
+            fb = batcher.submit(2)
+        assert (fa.result(5), fb.result(5)) == (1, 2)
+    finally:
+        batcher.close()
+    for tracer in (a, b):
+        names = {e["name"]: e["args"] for e in tracer._events}
+        assert names == {"model": {"size": 2}, "t:micro_batch": {"size": 2}}
+
+
+def test_profile_option_requires_known_stage_names(capsys):
+    import pytest
+
+    pytest.importorskip("numpy")
+    from app.main import STAGES, parse_args
+
+    args = parse_args(["mix.wav", "tgt.wav", "--profile", "vad,label"])
+    assert args.profile == ["vad", "label"] and args.mixture == Path("mix.wav")
+    assert parse_args(["mix.wav", "tgt.wav", "--profile", "all"]).profile == list(STAGES)
+    assert parse_args(["mix.wav", "tgt.wav"]).profile == []
+    for argv in (["--profile", "mix.wav", "tgt.wav"], ["mix.wav", "tgt.wav", "--profile", "vad,lable"]):
+        with pytest.raises(SystemExit):
+            parse_args(argv)
+    assert "unknown stage(s)" in capsys.readouterr().err
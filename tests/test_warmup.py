@@ -0,0 +1,32 @@
+import pytest
+
+
+def test_warm_up_failure_keeps_server_not_ready():
+    pytest.importorskip("numpy")
+    from app.pipeline import warmup
+
+    assert warmup.parse_models(" ecapa, vad ,,whisper:tiny") == ["ecapa", "vad", "whisper:tiny"]
+    assert warmup.parse_models("none") == warmup.parse_models("") == []
+    status = warmup.warm_up(["not-a-model"])
+    assert status["not-a-model"]["ok"] is False
+    assert "Unknown warm-up model" in status["not-a-model"]["error"]
+    assert not warmup.is_ready()
+    assert warmup.failed_models() == ["not-a-model"]
+
+
+def test_speaker_encoder_is_cached_per_device(monkeypatch):
+    pytest.importorskip("numpy")
+    from app.pipeline import embedding
+
+    class FakeEncoder:
+        @classmethod
+        def from_hparams(cls, source, run_opts, savedir=None):
+            return run_opts["device"]
+
+    monkeypatch.setattr(embedding, "patch_torchaudio_backends", lambda: None)
+    monkeypatch.setattr(embedding, "_resolve_encoder_classifier", lambda: FakeEncoder)
+    monkeypatch.setattr(embedding, "_SB_CLASSIFIERS", {})
+    assert embedding._get_classifier("cpu") == "cpu"
+    assert embedding._get_classifier("cuda:0") == "cuda:0"
+    assert embedding._get_classifier("cpu") == "cpu"
+    assert sorted(embedding._SB_CLASSIFIERS) == ["cpu", "cuda:0"]